@@ -0,0 +1,78 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+from datetime import date
+from collections import namedtuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from main import pg_row_to_bson, make_row_converter, DATE_OID
+
+
+# Stand-in for psycopg's Column: only name and type_code are read
+Column = namedtuple("Column", "name type_code")
+
+TEXT_OID = 25
+INT_OID = 23
+
+# Shaped like the raw person and eierskap tables
+TABLES = {
+    "with_dates": [
+        Column("uuid", TEXT_OID), Column("navn", TEXT_OID), Column("fødselsdato", DATE_OID),
+        Column("kommune", TEXT_OID), Column("fradato", DATE_OID), Column("tildato", DATE_OID),
+        Column("antall", INT_OID), Column("kilde", TEXT_OID),
+    ],
+    "without_dates": [
+        Column("orgnr", TEXT_OID), Column("navn", TEXT_OID), Column("aksjeklasse", TEXT_OID),
+        Column("antall", INT_OID), Column("eierskapår", INT_OID), Column("kommune", TEXT_OID),
+        Column("postnr", TEXT_OID), Column("land", TEXT_OID),
+    ],
+}
+
+
+def make_rows(description, n):
+    # About 30 000 distinct dates (80 years of birth dates); every other date column is null
+    first = date(1940, 1, 1).toordinal()
+    values = {TEXT_OID: lambda i: "Ola Nordmann", INT_OID: lambda i: i}
+    rows = []
+    for i in range(n):
+        row = []
+        for j, col in enumerate(description):
+            if col.type_code == DATE_OID:
+                row.append(date.fromordinal(first + (i * 7919 + j) % 29_000) if (i + j) % 2 else None)
+            else:
+                row.append(values[col.type_code](i))
+        rows.append(tuple(row))
+    return rows
+
+
+def cpu_seconds(fn, rows):
+    start = time.process_time()
+    for _ in map(fn, rows):
+        pass
+    return time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU time to turn Postgres rows into BSON documents")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per variant, best is kept")
+    args = parser.parse_args()
+
+    print(f"{'table':<15} {'per-value checks':>18} {'precompiled':>12} {'speedup':>8}   (CPU s per million rows)")
+    for table, description in TABLES.items():
+        rows = make_rows(description, args.rows)
+        names = [col.name for col in description]
+        convert = make_row_converter(description)
+
+        # Both variants must produce the same documents
+        assert all(pg_row_to_bson(names, r) == convert(r) for r in rows[:1000])
+
+        scale = 1_000_000 / args.rows
+        old = min(cpu_seconds(lambda r: pg_row_to_bson(names, r), rows) for _ in range(args.repeat)) * scale
+        new = min(cpu_seconds(convert, rows) for _ in range(args.repeat)) * scale
+        print(f"{table:<15} {old:>18.2f} {new:>12.2f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
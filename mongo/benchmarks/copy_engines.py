@@ -0,0 +1,47 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import psycopg
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from main import load_version, get_pg_conninfo, make_row_converter, COPY_ENGINES, _describe
+
+
+def read_table(pg_conninfo, table, engine):
+    # Postgres side of build_copy only: read every row and convert it to a document
+    rows = 0
+    start = time.perf_counter()
+    with psycopg.connect(**pg_conninfo) as pg:
+        query = f"SELECT * FROM {table}"
+        description = _describe(pg, query)
+        convert = make_row_converter(description)
+        for batch in COPY_ENGINES[engine](pg, query, "benchmark", description):
+            rows += len(list(map(convert, batch)))
+    return rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare copy engines on one table")
+    parser.add_argument("version", help="version YAML in mongo/versions")
+    parser.add_argument("table")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per engine, best is kept")
+    args = parser.parse_args()
+
+    cfg = load_version(args.version)
+    if not cfg:
+        sys.exit(1)
+    pg_conninfo = get_pg_conninfo(cfg["source_postgres"])
+
+    print(f"{'engine':<8} {'rows':>10} {'seconds':>9} {'rows/s':>10}")
+    for engine in COPY_ENGINES:
+        best = None
+        for _ in range(args.repeat):
+            rows, elapsed = read_table(pg_conninfo, args.table, engine)
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{engine:<8} {rows:>10} {best:>9.2f} {rows / max(best, 1e-9):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import bson
+from bson.raw_bson import RawBSONDocument
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError
+
+
+# Encoded BSON bytes per insert batch, and batches sent at the same time per writer
+BATCH_BYTES = 8 * 1024 * 1024
+IN_FLIGHT = 4
+
+DUPLICATE_KEY = 11000
+
+# Requests per bulk_write call when applying upserts and deletes
+OPS_PER_BATCH = 1000
+
+
+def with_write_concern(coll, write_concern: dict | None):
+    # write_concern comes from the version YAML, e.g. {"w": 1, "j": False}
+    if not write_concern:
+        return coll
+    return coll.with_options(write_concern=WriteConcern(**write_concern))
+
+
+class BulkWriter:
+    """Unordered inserts in batches sized by encoded BSON bytes, with several batches in flight.
+
+    Documents are encoded once when added, so wide documents give small batches and
+    slim documents give large ones. Use as a context manager, or call close() to flush.
+    With ignore_duplicates, documents whose _id already exists are skipped, which lets
+    a resumed copy re-send rows written after its last checkpoint.
+    """
+
+    def __init__(self, coll, write_concern: dict | None = None,
+                 batch_bytes: int = BATCH_BYTES, in_flight: int = IN_FLIGHT,
+                 ignore_duplicates: bool = False):
+        self._coll = with_write_concern(coll, write_concern)
+        self._ignore_duplicates = ignore_duplicates
+        self._batch_bytes = batch_bytes
+        self._in_flight = in_flight
+        self._pool = ThreadPoolExecutor(max_workers=in_flight)
+        self._pending = {}
+        self._batch = []
+        self._size = 0
+        self.inserted = 0
+
+    def add(self, doc):
+        if not isinstance(doc, RawBSONDocument):
+            doc = RawBSONDocument(bson.encode(doc))
+        size = len(doc.raw)
+        if self._batch and self._size + size > self._batch_bytes:
+            self._send()
+        self._batch.append(doc)
+        self._size += size
+
+    def add_many(self, docs):
+        for doc in docs:
+            self.add(doc)
+
+    def _send(self):
+        if not self._batch:
+            return
+        if len(self._pending) >= self._in_flight:
+            done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+            self._collect(done)
+        future = self._pool.submit(self._coll.insert_many, self._batch, ordered=False)
+        self._pending[future] = len(self._batch)
+        self._batch = []
+        self._size = 0
+
+    def _collect(self, done):
+        for future in done:
+            count = self._pending.pop(future)
+            try:
+                future.result()
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if not self._ignore_duplicates or any(err["code"] != DUPLICATE_KEY for err in errors):
+                    raise
+                count = e.details.get("nInserted", 0)
+            self.inserted += count
+
+    def drain(self):
+        # Send the current batch and wait until every batch sent so far is acknowledged
+        self._send()
+        done, _ = wait(self._pending)
+        self._collect(done)
+
+    def close(self):
+        try:
+            self.drain()
+        finally:
+            self._pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._pool.shutdown(cancel_futures=True)
+
+
+def write_ops(coll, ops, write_concern: dict | None = None, batch_size: int = OPS_PER_BATCH) -> int:
+    """Send write requests (ReplaceOne, DeleteOne, ...) as unordered bulk_write batches."""
+    coll = with_write_concern(coll, write_concern)
+    sent = 0
+    batch = []
+    for op in ops:
+        batch.append(op)
+        if len(batch) >= batch_size:
+            coll.bulk_write(batch, ordered=False)
+            sent += len(batch)
+            batch = []
+    if batch:
+        coll.bulk_write(batch, ordered=False)
+        sent += len(batch)
+    return sent
@@ -1,10 +1,23 @@
 import os
+import math
+import hashlib
+import time
+import queue
+import threading
 import yaml
 from pathlib import Path
 from datetime import date, datetime
+from itertools import islice
+from functools import partial
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import bson
 import psycopg
-from pymongo import MongoClient, ASCENDING
+from psycopg import sql
+from pymongo import MongoClient, IndexModel, ReplaceOne, DeleteOne, ASCENDING
+
+from bulk import BulkWriter, with_write_concern, write_ops
 
 
 # ----------------------------
@@ -63,237 +76,1102 @@ def pg_row_to_bson(col_names, row):
     return doc
 
 
+# Postgres type OID of `date`; BSON has no date-only type, so these become datetimes
+DATE_OID = 1082
+
+
+def make_row_converter(description):
+    """Build a row -> document function from a cursor description, checked once per query."""
+    names = [col.name for col in description]
+    date_cols = [col.name for col in description if col.type_code == DATE_OID]
+
+    if not date_cols:
+        return lambda row: dict(zip(names, row))
+
+    # Few distinct dates repeat across many rows, so each one is converted only once
+    datetimes = {}
+
+    def convert(row):
+        doc = dict(zip(names, row))
+        for name in date_cols:
+            val = doc[name]
+            if val is not None:
+                dt = datetimes.get(val)
+                if dt is None:
+                    dt = datetimes[val] = datetime(val.year, val.month, val.day)
+                doc[name] = dt
+        return doc
+
+    return convert
+
+
 # ----------------------------
 # Build: raw copy Postgres -> Mongo
 # ----------------------------
 
-def build_copy(pg_conninfo: dict, mongo_dbname: str, tables: list[str]):
-    print(f"[INFO] Copying tables to Mongo database '{mongo_dbname}'")
+# Rows per key range before a table is split across several copy workers
+SPLIT_ROWS = 1_000_000
+
+# Copy plan and checkpoints for --resume, kept in the raw copy database
+STATE_COLLECTION = "_build_state"
+
+# Rows written between checkpoints of a copy task
+CHECKPOINT_ROWS = 100_000
+
+
+def _leaf_relations(pg, table: str) -> list[tuple]:
+    # The table itself, or every leaf partition at any depth: every relation is scanned on its
+    # own, so ctids are unique within a task and come out in ascending order
+    with pg.cursor() as cur:
+        cur.execute(
+            """
+            SELECT c.oid::regclass::text, greatest(c.reltuples, 0), c.relpages, c.relkind
+            FROM pg_partition_tree(to_regclass(%s)) t
+            JOIN pg_class c ON c.oid = t.relid
+            WHERE t.isleaf
+            ORDER BY 1
+            """,
+            (table,),
+        )
+        leaves = cur.fetchall()
+    other = [relation for relation, _, _, relkind in leaves if relkind != "r"]
+    if other:
+        # e.g. foreign tables: no heap pages to split on, and skipping them would lose rows
+        raise ValueError(f"'{table}' has partitions that are not plain tables: {', '.join(other)}")
+    return [(relation, reltuples, relpages) for relation, reltuples, relpages, _ in leaves]
+
+
+def _plan_splits(reltuples: float, relpages: int, max_splits: int, split_rows: int = SPLIT_ROWS) -> list[tuple]:
+    # Ranges of heap pages, sized from pg_class.reltuples
+    n = min(max_splits, max(1, math.ceil(reltuples / split_rows)), max(relpages, 1))
+    if n <= 1:
+        return [(None, None)]
+    step = math.ceil(relpages / n)
+    starts = [i * step for i in range(n)]
+    # First and last ranges are open so pages added since the last ANALYZE are still copied
+    return [
+        (start if i else None, starts[i + 1] if i + 1 < n else None)
+        for i, start in enumerate(starts)
+    ]
+
+
+def _relkind(pg, table: str) -> str | None:
+    with pg.cursor() as cur:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+        row = cur.fetchone()
+        return row[0] if row else None
+
+
+def _plan_tasks(pg, table: str, max_splits: int, split_rows: int = SPLIT_ROWS) -> list[dict]:
+    # One task per page range of each relation; the task documents double as build state
+    kind = _relkind(pg, table)
+    if kind is None:
+        raise ValueError(f"relation '{table}' does not exist in Postgres")
+    if kind not in ("r", "p"):
+        # Views and materialized views are read with a plain SELECT *: no ranges, no row ids,
+        # and no checkpoints, so a resumed copy starts the table over
+        return [{
+            "_id": f"{table}/{table}/0",
+            "table": table,
+            "relation": table,
+            "rel_index": None,
+            "start": None,
+            "end": None,
+            "last_id": None,
+            "done": False,
+        }]
+
+    relations = _leaf_relations(pg, table)
+    if not relations:
+        raise ValueError(f"'{table}' has no partitions to copy")
+    tasks = []
+    for rel_index, (relation, reltuples, relpages) in enumerate(relations):
+        for part, (start, end) in enumerate(_plan_splits(reltuples, relpages, max_splits, split_rows)):
+            tasks.append({
+                "_id": f"{table}/{relation}/{part}",
+                "table": table,
+                "relation": relation,
+                "rel_index": rel_index,
+                "start": start,
+                "end": end,
+                "last_id": None,
+                "done": False,
+            })
+    return tasks
+
+
+def _row_id(rel_index: int) -> str:
+    # Deterministic _id: relation index, heap page and line pointer packed into an int64,
+    # so a resumed task can re-read rows past its checkpoint without duplicating them
+    return (f"(({rel_index}::bigint << 48) | ((ctid::text::point)[0]::bigint << 16) "
+            f"| (ctid::text::point)[1]::bigint)")
+
+
+def _task_query(task: dict) -> str:
+    if task["rel_index"] is None:
+        return f"SELECT * FROM {task['relation']}"
+    conds = []
+    if task["start"] is not None:
+        conds.append(f"ctid >= '({task['start']},0)'::tid")
+    if task["end"] is not None:
+        conds.append(f"ctid < '({task['end']},0)'::tid")
+    if task["last_id"] is not None:
+        page, line = (task["last_id"] >> 16) & 0xFFFFFFFF, task["last_id"] & 0xFFFF
+        conds.append(f"ctid > '({page},{line})'::tid")
+    where = f" WHERE {' AND '.join(conds)}" if conds else ""
+    return f"SELECT {_row_id(task['rel_index'])} AS _id, * FROM ONLY {task['relation']}{where}"
+
+
+# Rows per fetch, and batches buffered between the read, convert and write stages
+FETCH_SIZE = 5000
+PIPELINE_DEPTH = 4
+
+_DONE = object()
+
+
+def _put(q, item, stop, stalls: dict, key: str) -> bool:
+    # Blocks while the next stage is behind; gives up once the pipeline is stopped
+    start = time.perf_counter()
+    try:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    finally:
+        stalls[key] += time.perf_counter() - start
+
+
+def _get(q, stop, stalls: dict, key: str):
+    start = time.perf_counter()
+    try:
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+    finally:
+        stalls[key] += time.perf_counter() - start
+
+
+def _convert_stage(rows_q, docs_q, convert, stop, stalls):
+    while (rows := _get(rows_q, stop, stalls, "convert_in")) is not _DONE:
+        docs = list(map(convert, rows))
+        if not _put(docs_q, docs, stop, stalls, "convert_out"):
+            return
+    _put(docs_q, _DONE, stop, stalls, "convert_out")
+
+
+def _write_stage(docs_q, writer, checkpoint, stop, stalls):
+    with writer:
+        since_checkpoint = 0
+        while (docs := _get(docs_q, stop, stalls, "write_in")) is not _DONE:
+            writer.add_many(docs)
+            since_checkpoint += len(docs)
+            if checkpoint and docs and since_checkpoint >= CHECKPOINT_ROWS:
+                # Rows arrive in ctid order, so once everything sent is acknowledged,
+                # the last _id is a safe place to resume from
+                writer.drain()
+                checkpoint(docs[-1]["_id"])
+                since_checkpoint = 0
+        if stop.is_set():
+            raise RuntimeError("copy stopped")
+
+
+def _run_stage(target, errors, stop, *args):
+    try:
+        target(*args)
+    except BaseException as e:
+        errors.append(e)
+        stop.set()
+
+
+def _describe(pg, query: str):
+    with pg.cursor() as cur:
+        cur.execute(f"SELECT * FROM ({query}) s LIMIT 0")  # type: ignore[arg-type]
+        return cur.description
+
+
+def _cursor_batches(pg, query: str, name: str, description):
+    # Row batches through a server-side cursor
+    with pg.cursor(name=name) as cur:
+        cur.itersize = FETCH_SIZE
+        cur.execute(query)  # type: ignore[arg-type]
+        while (rows := cur.fetchmany(FETCH_SIZE)):
+            yield rows
+
+
+def _copy_batches(pg, query: str, name: str, description):
+    # Row batches decoded from a binary COPY stream, without the per-row cursor protocol
+    types = [col.type_code for col in description]
+    with pg.cursor() as cur:
+        with cur.copy(f"COPY ({query}) TO STDOUT (FORMAT BINARY)") as copy:  # type: ignore[arg-type]
+            copy.set_types(types)
+            rows = copy.rows()
+            while (batch := list(islice(rows, FETCH_SIZE))):
+                yield batch
+
+
+COPY_ENGINES = {
+    "cursor": _cursor_batches,
+    "copy": _copy_batches,
+}
+
+
+def _copy_table(pg_conninfo: dict, mongo, task: dict, engine: str = "cursor",
+                write_concern: dict | None = None) -> tuple[int, dict]:
+    # Runs in a worker thread. This thread reads from Postgres while two helper threads
+    # convert rows and insert into Mongo; bounded queues keep memory at a few batches.
+    state = mongo[STATE_COLLECTION]
+    writer = BulkWriter(mongo[task["table"]], write_concern, ignore_duplicates=True)
+    stalls = dict.fromkeys(("read_out", "convert_in", "convert_out", "write_in"), 0.0)
+    stop = threading.Event()
+    errors = []
+    rows_q = queue.Queue(maxsize=PIPELINE_DEPTH)
+    docs_q = queue.Queue(maxsize=PIPELINE_DEPTH)
+
+    def checkpoint(last_id):
+        state.update_one({"_id": task["_id"]}, {"$set": {"last_id": last_id}})
+
+    if task["rel_index"] is None:
+        # Without row ids, rows written before an interruption cannot be skipped
+        mongo[task["table"]].delete_many({})
+        checkpoint = None
+
+    with psycopg.connect(**pg_conninfo) as pg:
+        # Checkpoints need rows in ctid order: no scan that starts mid-table, no parallel workers
+        pg.execute("SET synchronize_seqscans = off")
+        pg.execute("SET max_parallel_workers_per_gather = 0")
+        query = _task_query(task)
+        description = _describe(pg, query)
+        convert = make_row_converter(description)
+        batches = COPY_ENGINES[engine](pg, query, f"cur_{task['table']}", description)
+
+        stages = [
+            threading.Thread(target=_run_stage, args=(
+                _convert_stage, errors, stop, rows_q, docs_q, convert, stop, stalls)),
+            threading.Thread(target=_run_stage, args=(
+                _write_stage, errors, stop, docs_q, writer, checkpoint, stop, stalls)),
+        ]
+        for t in stages:
+            t.start()
+        try:
+            for rows in batches:
+                if stop.is_set() or not _put(rows_q, rows, stop, stalls, "read_out"):
+                    break
+            _put(rows_q, _DONE, stop, stalls, "read_out")
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            for t in stages:
+                t.join()
+            batches.close()
+
+    if errors:
+        raise errors[0]
+    state.update_one({"_id": task["_id"]}, {"$set": {"done": True}})
+    return writer.inserted, stalls
+
+
+def _format_stalls(stalls: dict) -> str:
+    # Seconds each stage spent blocked on its neighbours; the stage that waits least is the bottleneck
+    return (
+        f"read blocked {stalls['read_out']:.1f}s, "
+        f"convert waiting {stalls['convert_in']:.1f}s / blocked {stalls['convert_out']:.1f}s, "
+        f"write waiting {stalls['write_in']:.1f}s"
+    )
+
+
+def build_copy(pg_conninfo: dict, mongo_dbname: str, tables: list[str], workers: int = 4,
+               split_rows: int = SPLIT_ROWS, engine: str = "cursor",
+               write_concern: dict | None = None, resume: bool = False) -> bool:
+    if engine not in COPY_ENGINES:
+        print(f"[ERROR] Unknown copy_engine '{engine}'. Use one of: {', '.join(COPY_ENGINES)}")
+        return False
+    print(f"[INFO] Copying tables to Mongo database '{mongo_dbname}' with {workers} workers ({engine} engine)")
 
     client = MongoClient(get_mongo_uri())
     mongo = client[mongo_dbname]
+    state = mongo[STATE_COLLECTION]
+
+    saved = list(state.find({})) if resume else []
+    if resume and not saved:
+        print("[INFO] No build state to resume, starting a full copy")
+    if not resume:
+        state.drop()
+
+    # tables without saved state are cleared and planned from scratch
+    planned = {task["table"] for task in saved}
+    fresh = [table for table in tables if table not in planned]
+    for table in fresh:
+        mongo[table].drop()
+        _fp_collection(mongo[table]).drop()
 
+    # split large tables into page ranges, sized from pg_class.reltuples
+    new_tasks = []
+    failed = {}
     with psycopg.connect(**pg_conninfo) as pg:
-        # clear target collections
-        for table in tables:
-            mongo[table].drop()
-
-        for table in tables:
-            print(f"[COPY] {table}")
-            coll = mongo[table]
-            with pg.cursor(name=f"cur_{table}") as cur:  # server-side cursor
-                cur.itersize = 5000
-                cur.execute(f"SELECT * FROM {table}")  # type: ignore[arg-type]
-                col_names = [d[0] for d in cur.description]  # type: ignore[index]
-                while (rows := cur.fetchmany(5000)):
-                    docs = [pg_row_to_bson(col_names, r) for r in rows]
-                    if docs:
-                        coll.insert_many(docs, ordered=False)
+        for table in fresh:
+            try:
+                table_tasks = _plan_tasks(pg, table, workers, split_rows)
+            except ValueError as e:
+                failed[table] = [f"{table}: {e}"]
+                continue
+            if len(table_tasks) > 1:
+                print(f"[COPY] {table}: split into {len(table_tasks)} ranges")
+            new_tasks.extend(table_tasks)
+    if new_tasks:
+        state.insert_many(new_tasks)
+
+    for table in tables:
+        if table in planned:
+            left = [task for task in saved if task["table"] == table and not task["done"]]
+            checkpoints = sum(task["last_id"] is not None for task in left)
+            status = f"{len(left)} ranges left, {checkpoints} from a checkpoint" if left else "already copied"
+            print(f"[RESUME] {table}: {status}")
+
+    tasks = [task for task in saved + new_tasks if task["table"] in tables and not task["done"]]
+    copied = {table: 0 for table in tables}
+    stalls = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_copy_table, pg_conninfo, mongo, task, engine, write_concern): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                rows, task_stalls = future.result()
+                copied[task["table"]] += rows
+                totals = stalls.setdefault(task["table"], dict.fromkeys(task_stalls, 0.0))
+                for key, seconds in task_stalls.items():
+                    totals[key] += seconds
+            except Exception as e:
+                failed.setdefault(task["table"], []).append(f"{task['_id']}: {e}")
+
+    for table in tables:
+        if table in failed:
+            status = "failed"
+        elif table in stalls:
+            status = f"{copied[table]} rows ({_format_stalls(stalls[table])})"
+        else:
+            status = "already copied"
+        print(f"[COPY] {table}: {status}")
 
     client.close()
+
+    if failed:
+        print(f"[ERROR] {len(failed)} of {len(tables)} tables failed to copy:")
+        for table, errors in failed.items():
+            for err in errors:
+                print(f" - {err}")
+        print("[INFO] Rerun with --resume to continue from the last checkpoints")
+        return False
+
     print("[OK] Raw copy complete")
+    return True
 
 
 # ----------------------------
 # Build: structure Mongo from raw
 # ----------------------------
 
-def build_structured(raw_dbname: str, structured_dbname: str):
-    print(f"[INFO] Structuring '{raw_dbname}' -> '{structured_dbname}'")
+# Field specs: structured field -> raw field, or a nested spec for a subdocument.
+# The same spec drives the Python reshape and the server-side $project.
+SELSKAP_FIELDS = {
+    "orgnr": "orgnr",
+    "uuid": "uuid",
+    "navn": "navn",
+    "organisasjonstype": "organisasjonstype",
+    "nacekode": "nacekode",
+    "etablertdato": "etablertdato",
+    "oppløstdato": "oppløstdato",
+    "konkursflagg": "konkursflagg",
+    "likvidasjonflagg": "likvidasjonflagg",
+}
+
+EIERSKAP_FIELDS = {
+    "ownership_uuid": "eierskapuuid",
+    "year": "eierskapår",
+    "owner": {
+        "uuid": "eierpersonuuid",
+        "navn": "eierpersonnavn",
+        "foedselsdato": "eierpersonfødselsdato",
+        "foedselsaar": "eierpersonfødselsår",
+        "adresse": "eierpersonadresse",
+        "postkode": "eierpersonpostkode",
+        "poststed": "eierpersonpoststed",
+        "kommunenr": "eierpersonkommunenr",
+        "kommune": "eierpersonkommune",
+    },
+    "company": {
+        "orgnr": "utstederorgnr",
+        "uuid": "utstederuuid",
+        "navn": "utstedernavn",
+    },
+    "andel": "eierskapandel",
+    "antall": "eierskapantall",
+    "stemmeandel": "eierskapstemmeandel",
+    "totalantall": "eierskaptotalantall",
+    "stemmeantall": "eierskapstemmeantall",
+    "totalsstemmeantall": "eierskaptotalstemmeantall",
+}
+
+AKSJEEIEBOK_FIELDS = {
+    "orgnr": "orgnr",
+    "selskap": "selskap",
+    "år": "år",
+    "aksjeklasse": "aksjeklasse",
+    "aksjonær": {
+        "navn": "aksjonærnavn",
+        "nr": "aksjonærnr",
+        "poststed": "poststed",
+        "landkode": "landkode",
+    },
+    "antallaksjer": "antallaksjer",
+    "antallaksjerselskap": "antallaksjerselskap",
+}
+
+POLITIKERE_FIELDS = {
+    "navn": "navn",
+    "parti": "parti",
+    "kommunenr": "kommunenr",
+    "kommune": "kommune",
+    "foedselsdato": "fødselsdato",
+    "listeplass": "listeplass",
+    "stemmetillegg": "stemmetillegg",
+    "personstemmer": "persontemmer",
+    "slengere": "slengere",
+    "endeligrangering": "endeligrangering",
+    "innvalgt": "innvalgt",
+}
+
+# person has one document per uuid, with a role per raw row
+PERSON_FIELDS = {
+    "uuid": "uuid",
+    "navn": "navn",
+    "foedselsdato": "fødselsdato",
+    "foedselsaar": "fødselsår",
+    "kjonnuuid": "kjønnuuid",
+    "adresse": {
+        "adresse": "adresse",
+        "postnummer": "postnummer",
+        "poststed": "poststed",
+        "land": "land",
+        "landkode": "landkode",
+    },
+    "kommune": {
+        "nr": "kommunenr",
+        "navn": "kommunenavn",
+    },
+}
+
+PERSON_ROLE_FIELDS = {
+    "orgnr": "selskaporgnr",
+    "selskapuuid": "selskapuuid",
+    "selskapnavn": "selskapnavn",
+    "rolle": "selskaprolle",
+    "rolleuuid": "rolleuuid",
+    "rolleregistrert": "rolleregistrert",
+    "rolleoppdatert": "rolleoppdatert",
+    "rollestartdato": "rollestartdato",
+    "rollesluttdato": "rollesluttdato",
+    "rollerang": "selskaprollerang",
+}
+
+# Collections that are a one-to-one reshape of a raw collection
+RESHAPES = {
+    "selskap": SELSKAP_FIELDS,
+    "eierskap": EIERSKAP_FIELDS,
+    "aksjeeiebok": AKSJEEIEBOK_FIELDS,
+    "politikere": POLITIKERE_FIELDS,
+}
+
+STRUCTURED_ENGINES = ("python", "pushdown")
+
+STRUCTURED_COLLECTIONS = ["selskap", "person", "eierskap", "aksjeeiebok", "politikere"]
+
+INDEXES = {
+    "selskap": [],
+    "person": [IndexModel([("uuid", ASCENDING)], unique=True)],
+    "eierskap": [
+        IndexModel([("company.orgnr", ASCENDING)]),
+        IndexModel([("owner.uuid", ASCENDING)]),
+    ],
+    "aksjeeiebok": [
+        IndexModel([("orgnr", ASCENDING)]),
+        IndexModel([("år", ASCENDING)]),
+    ],
+    "politikere": [
+        IndexModel([("navn", ASCENDING)]),
+        IndexModel([("parti", ASCENDING)]),
+        IndexModel([("kommunenr", ASCENDING)]),
+    ],
+}
+
+
+def reshape_doc(fields: dict, doc: dict) -> dict:
+    return {
+        name: reshape_doc(source, doc) if isinstance(source, dict) else doc.get(source)
+        for name, source in fields.items()
+    }
+
+
+def reshape_projection(fields: dict) -> dict:
+    # $ifNull turns a missing raw field into null, like dict.get() does in reshape_doc
+    return {
+        name: reshape_projection(source) if isinstance(source, dict) else {"$ifNull": [f"${source}", None]}
+        for name, source in fields.items()
+    }
+
+
+def _reshape(src, dst, fields: dict, write_concern=None, engine="python"):
+    if engine == "pushdown":
+        # Runs inside mongod; documents keep the raw _id
+        with_write_concern(src, write_concern).aggregate([
+            {"$project": reshape_projection(fields)},
+            {"$merge": {
+                "into": {"db": dst.database.name, "coll": dst.name},
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }},
+        ])
+        return
+
+    with BulkWriter(dst, write_concern) as writer:
+        for doc in src.find({}):
+            writer.add(reshape_doc(fields, doc))
+
+
+def build_structured(raw_dbname: str, structured_dbname: str, write_concern: dict | None = None,
+                     engine: str = "python") -> bool:
+    print(f"[INFO] Structuring '{raw_dbname}' -> '{structured_dbname}' ({engine} engine)")
 
     client = MongoClient(get_mongo_uri())
     raw = client[raw_dbname]
     structured = client[structured_dbname]
 
     # reset target collections
-    for coll in ["selskap", "person", "eierskap", "aksjeeiebok", "politikere"]:
+    for coll in STRUCTURED_COLLECTIONS:
         structured[coll].drop()
+        _fp_collection(structured[coll]).drop()
 
-    _build_selskap(raw, structured)
-    _build_person(raw, structured)
-    _build_eierskap(raw, structured)
-    _build_aksjeeiebok(raw, structured)
-    _build_politikere(raw, structured)
+    ok = _run_builders(structured, {
+        "selskap": partial(_build_selskap, raw, structured, write_concern, engine),
+        "person": partial(_build_person, raw, structured, write_concern),
+        "eierskap": partial(_build_eierskap, raw, structured, write_concern, engine),
+        "aksjeeiebok": partial(_build_aksjeeiebok, raw, structured, write_concern, engine),
+        "politikere": partial(_build_politikere, raw, structured, write_concern, engine),
+    })
 
     client.close()
-    print("[OK] Structured build complete")
-
-
-def _build_selskap(raw, structured):
-    src = raw["selskap"]
-    dst = structured["selskap"]
-
-    bulk = []
-    for s in src.find({}):
-        bulk.append({
-            "orgnr": s.get("orgnr"),
-            "uuid": s.get("uuid"),
-            "navn": s.get("navn"),
-            "organisasjonstype": s.get("organisasjonstype"),
-            "nacekode": s.get("nacekode"),
-            "etablertdato": s.get("etablertdato"),
-            "oppløstdato": s.get("oppløstdato"),
-            "konkursflagg": s.get("konkursflagg"),
-            "likvidasjonflagg": s.get("likvidasjonflagg"),
-        })
-        if len(bulk) >= 1000:
-            dst.insert_many(bulk)
-            bulk = []
-    if bulk:
-        dst.insert_many(bulk)
-
-
-def _build_person(raw, structured):
+    if ok:
+        print("[OK] Structured build complete")
+    return ok
+
+
+def _run_builders(structured, builders: dict) -> bool:
+    # Builders run concurrently; each collection gets all its indexes in one
+    # create_indexes call once its data is loaded
+    def run(name, builder):
+        print(f"[STRUCT] {name}: started")
+        start = time.perf_counter()
+        builder()
+        loaded = time.perf_counter()
+        if INDEXES[name]:
+            structured[name].create_indexes(INDEXES[name])
+        count = structured[name].estimated_document_count()
+        print(f"[STRUCT] {name}: {count} documents in {loaded - start:.1f}s, "
+              f"indexes in {time.perf_counter() - loaded:.1f}s")
+
+    failed = {}
+    with ThreadPoolExecutor(max_workers=len(builders)) as pool:
+        futures = {pool.submit(run, name, builder): name for name, builder in builders.items()}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                failed[futures[future]] = e
+
+    if failed:
+        print(f"[ERROR] {len(failed)} of {len(builders)} collections failed to build:")
+        for name, e in failed.items():
+            print(f" - {name}: {e}")
+        return False
+    return True
+
+
+def _digests(coll) -> Counter:
+    # Documents without _id, re-encoded from decoded values so equal content gives equal bytes
+    return Counter(
+        hashlib.sha1(bson.encode(doc)).digest()
+        for doc in coll.find({}, {"_id": False})
+    )
+
+
+def compare_structured(raw_dbname: str, structured_dbname: str, write_concern: dict | None = None) -> bool:
+    """Build the reshaped collections with both engines, check they match and time them."""
+    print(f"[INFO] Comparing structured engines on '{raw_dbname}'")
+
+    client = MongoClient(get_mongo_uri())
+    raw = client[raw_dbname]
+    targets = {engine: client[f"{structured_dbname}_{engine}"] for engine in STRUCTURED_ENGINES}
+
+    print(f"{'collection':<14} {'python s':>9} {'pushdown s':>11}  output")
+    ok = True
+    for name, fields in RESHAPES.items():
+        timings = {}
+        for engine, db in targets.items():
+            db[name].drop()
+            start = time.perf_counter()
+            _reshape(raw[name], db[name], fields, write_concern, engine)
+            timings[engine] = time.perf_counter() - start
+        same = _digests(targets["python"][name]) == _digests(targets["pushdown"][name])
+        ok = ok and same
+        print(f"{name:<14} {timings['python']:>9.1f} {timings['pushdown']:>11.1f}  {'identical' if same else 'DIFFERENT'}")
+
+    for db in targets.values():
+        client.drop_database(db.name)
+    client.close()
+
+    if not ok:
+        print("[ERROR] Pushdown output differs from the Python path")
+        return False
+    print("[OK] Both engines produce identical output")
+    return True
+
+
+def _build_selskap(raw, structured, write_concern=None, engine="python"):
+    _reshape(raw["selskap"], structured["selskap"], SELSKAP_FIELDS, write_concern, engine)
+
+
+def _person_doc(p):
+    return {**reshape_doc(PERSON_FIELDS, p), "roles": []}
+
+
+def _build_person(raw, structured, write_concern=None):
     src = raw["person"]
     dst = structured["person"]
 
-    dst.create_index([("uuid", ASCENDING)], unique=True)
+    # Rows arrive grouped by uuid, so each person is written as soon as the next one starts
+    # and memory does not grow with the collection. _id keeps the roles in insertion order.
+    src.create_index([("uuid", ASCENDING), ("_id", ASCENDING)])
+    rows = src.find({"uuid": {"$nin": [None, ""]}}).sort([("uuid", ASCENDING), ("_id", ASCENDING)])
+
+    with BulkWriter(dst, write_concern) as writer:
+        person = None
+        for p in rows:
+            if person is None or p["uuid"] != person["uuid"]:
+                if person is not None:
+                    writer.add(person)
+                person = _person_doc(p)
+            person["roles"].append(reshape_doc(PERSON_ROLE_FIELDS, p))
+        if person is not None:
+            writer.add(person)
+
+
+def _build_eierskap(raw, structured, write_concern=None, engine="python"):
+    _reshape(raw["eierskap"], structured["eierskap"], EIERSKAP_FIELDS, write_concern, engine)
+
+
+def _build_aksjeeiebok(raw, structured, write_concern=None, engine="python"):
+    _reshape(raw["aksjeeiebok"], structured["aksjeeiebok"], AKSJEEIEBOK_FIELDS, write_concern, engine)
+
+
+def _build_politikere(raw, structured, write_concern=None, engine="python"):
+    _reshape(raw["politikere"], structured["politikere"], POLITIKERE_FIELDS, write_concern, engine)
+
+
+# ----------------------------
+# Build: structure Mongo straight from Postgres
+# ----------------------------
+
+# Types json_agg does not round-trip, by OID: date, timestamp and timestamptz come back as
+# ISO strings; real and double precision as JSON numbers (1990.0 comes back as the int 1990)
+# or as the strings "NaN", "Infinity" and "-Infinity", all of which float() reads
+JSON_PARSERS = {
+    1082: datetime.fromisoformat,
+    1114: datetime.fromisoformat,
+    1184: datetime.fromisoformat,
+    700: float,
+    701: float,
+}
+
+
+def _json_object(fields: dict, columns: set) -> sql.Composable:
+    # json (not jsonb) keeps the key order of the spec; a column missing in Postgres is null
+    parts = []
+    for name, source in fields.items():
+        if isinstance(source, dict):
+            value = _json_object(source, columns)
+        elif source in columns:
+            value = sql.Identifier(source)
+        else:
+            value = sql.NULL
+        parts += [sql.Literal(name), value]
+    return sql.SQL("json_build_object({})").format(sql.SQL(", ").join(parts))
+
+
+def _typed_paths(fields: dict, parsers: dict, prefix=()) -> list[tuple]:
+    # (path, parser) for every field whose source column needs a parser
+    paths = []
+    for name, source in fields.items():
+        if isinstance(source, dict):
+            paths += _typed_paths(source, parsers, prefix + (name,))
+        elif source in parsers:
+            paths.append((prefix + (name,), parsers[source]))
+    return paths
+
+
+def _parse_typed(doc: dict, paths: list[tuple]):
+    for (*parents, name), parse in paths:
+        target = doc
+        for parent in parents:
+            target = target[parent]
+        if target[name] is not None:
+            target[name] = parse(target[name])
+
+
+def _direct_reshape(pg_conninfo: dict, dst, table: str, fields: dict, write_concern=None):
+    with psycopg.connect(**pg_conninfo) as pg:
+        with pg.cursor(name=f"direct_{table}") as cur:
+            cur.itersize = FETCH_SIZE
+            cur.execute(f"SELECT * FROM {table}")  # type: ignore[arg-type]
+            convert = make_row_converter(cur.description)
+            with BulkWriter(dst, write_concern) as writer:
+                for row in cur:
+                    writer.add(reshape_doc(fields, convert(row)))
+
+
+def _direct_person(pg_conninfo: dict, dst, write_concern=None):
+    # Grouping happens in Postgres; each row is a finished person with its roles in source order
+    with psycopg.connect(**pg_conninfo) as pg:
+        description = _describe(pg, "SELECT * FROM person")
+        columns = {col.name for col in description}
+        parsers = {col.name: JSON_PARSERS[col.type_code] for col in description if col.type_code in JSON_PARSERS}
+        person_paths = _typed_paths(PERSON_FIELDS, parsers)
+        role_paths = _typed_paths(PERSON_ROLE_FIELDS, parsers)
+
+        query = sql.SQL("""
+            SELECT json_agg({person} ORDER BY ctid) -> 0, json_agg({role} ORDER BY ctid)
+            FROM person
+            WHERE uuid <> ''
+            GROUP BY uuid
+        """).format(
+            person=_json_object(PERSON_FIELDS, columns),
+            role=_json_object(PERSON_ROLE_FIELDS, columns),
+        )
+
+        with pg.cursor(name="direct_person") as cur:
+            cur.itersize = FETCH_SIZE
+            cur.execute(query)
+            with BulkWriter(dst, write_concern) as writer:
+                for person, roles in cur:
+                    _parse_typed(person, person_paths)
+                    for role in roles:
+                        _parse_typed(role, role_paths)
+                    person["roles"] = roles
+                    writer.add(person)
+
+
+def build_direct(pg_conninfo: dict, structured_dbname: str, write_concern: dict | None = None) -> bool:
+    """Build the structured collections from Postgres, without the raw Mongo copy."""
+    print(f"[INFO] Structuring Postgres '{pg_conninfo['dbname']}' -> '{structured_dbname}' (direct)")
+
+    client = MongoClient(get_mongo_uri())
+    structured = client[structured_dbname]
+
+    for coll in STRUCTURED_COLLECTIONS:
+        structured[coll].drop()
+        _fp_collection(structured[coll]).drop()
+
+    builders = {
+        name: partial(_direct_reshape, pg_conninfo, structured[name], name, fields, write_concern)
+        for name, fields in RESHAPES.items()
+    }
+    builders["person"] = partial(_direct_person, pg_conninfo, structured["person"], write_concern)
+    ok = _run_builders(structured, builders)
+
+    client.close()
+    if ok:
+        print("[OK] Structured build complete")
+    return ok
+
+
+# ----------------------------
+# Sync: apply only what changed
+# ----------------------------
+
+# Columns that identify a raw row. Tables without an entry, or whose key turns out
+# not to be unique, are keyed by row content (md5 of the row plus an occurrence number).
+# Fingerprints of synced documents live in a side collection next to each collection, keyed
+# like the documents, so synced documents stay identical to the ones a full build writes
+SYNC_FP_PREFIX = "_sync_fp_"
+
+# Keys per Mongo $in lookup when fetching changed documents
+SYNC_LOOKUP_BATCH = 1000
+
+
+def _fp_collection(coll):
+    return coll.database[f"{SYNC_FP_PREFIX}{coll.name}"]
+
+
+def _fingerprints(coll, stale: list, key: str = "_id", key_type: type = int):
+    """(key, fingerprint) for every document, sorted by key; the fingerprint is None if never synced.
 
-    grouped = {}
-    for p in src.find({}):
-        uuid = p.get("uuid")
-        if not uuid:
+    Mongo sorts numbers before strings and strings before ObjectIds, and compares strings
+    bytewise, so keys of one type come back in the order _diff merges on. Keys of another
+    type (ObjectIds from a python-engine structured build, strings from older syncs) are
+    collected as stale _ids and deleted; their rows are written again.
+    """
+    fps = _fp_collection(coll).find({}).sort("_id", ASCENDING)
+    fp = next(fps, None)
+    for doc in coll.find({}, {key: True}).sort(key, ASCENDING):
+        value = doc.get(key)
+        if not isinstance(value, key_type):
+            stale.append(doc["_id"])
             continue
-        if uuid not in grouped:
-            grouped[uuid] = {
-                "uuid": uuid,
-                "navn": p.get("navn"),
-                "foedselsdato": p.get("fødselsdato"),
-                "foedselsaar": p.get("fødselsår"),
-                "kjonnuuid": p.get("kjønnuuid"),
-                "adresse": {
-                    "adresse": p.get("adresse"),
-                    "postnummer": p.get("postnummer"),
-                    "poststed": p.get("poststed"),
-                    "land": p.get("land"),
-                    "landkode": p.get("landkode"),
-                },
-                "kommune": {
-                    "nr": p.get("kommunenr"),
-                    "navn": p.get("kommunenavn"),
-                },
-                "roles": [],
-            }
-        grouped[uuid]["roles"].append({
-            "orgnr": p.get("selskaporgnr"),
-            "selskapuuid": p.get("selskapuuid"),
-            "selskapnavn": p.get("selskapnavn"),
-            "rolle": p.get("selskaprolle"),
-            "rolleuuid": p.get("rolleuuid"),
-            "rolleregistrert": p.get("rolleregistrert"),
-            "rolleoppdatert": p.get("rolleoppdatert"),
-            "rollestartdato": p.get("rollestartdato"),
-            "rollesluttdato": p.get("rollesluttdato"),
-            "rollerang": p.get("selskaprollerang"),
-        })
-    if grouped:
-        dst.insert_many(grouped.values())
-
-
-def _build_eierskap(raw, structured):
-    src = raw["eierskap"]
-    dst = structured["eierskap"]
-
-    dst.create_index([("company.orgnr", ASCENDING)])
-    dst.create_index([("owner.uuid", ASCENDING)])
-
-    bulk = []
-    for e in src.find({}):
-        bulk.append({
-            "ownership_uuid": e.get("eierskapuuid"),
-            "year": e.get("eierskapår"),
-            "owner": {
-                "uuid": e.get("eierpersonuuid"),
-                "navn": e.get("eierpersonnavn"),
-                "foedselsdato": e.get("eierpersonfødselsdato"),
-                "foedselsaar": e.get("eierpersonfødselsår"),
-                "adresse": e.get("eierpersonadresse"),
-                "postkode": e.get("eierpersonpostkode"),
-                "poststed": e.get("eierpersonpoststed"),
-                "kommunenr": e.get("eierpersonkommunenr"),
-                "kommune": e.get("eierpersonkommune"),
-            },
-            "company": {
-                "orgnr": e.get("utstederorgnr"),
-                "uuid": e.get("utstederuuid"),
-                "navn": e.get("utstedernavn"),
-            },
-            "andel": e.get("eierskapandel"),
-            "antall": e.get("eierskapantall"),
-            "stemmeandel": e.get("eierskapstemmeandel"),
-            "totalantall": e.get("eierskaptotalantall"),
-            "stemmeantall": e.get("eierskapstemmeantall"),
-            "totalsstemmeantall": e.get("eierskaptotalstemmeantall"),
-        })
-        if len(bulk) >= 2000:
-            dst.insert_many(bulk)
-            bulk = []
-    if bulk:
-        dst.insert_many(bulk)
-
-
-def _build_aksjeeiebok(raw, structured):
-    src = raw["aksjeeiebok"]
-    dst = structured["aksjeeiebok"]
-
-    dst.create_index([("orgnr", ASCENDING)])
-    dst.create_index([("år", ASCENDING)])
-
-    bulk = []
-    for a in src.find({}):
-        bulk.append({
-            "orgnr": a.get("orgnr"),
-            "selskap": a.get("selskap"),
-            "år": a.get("år"),
-            "aksjeklasse": a.get("aksjeklasse"),
-            "aksjonær": {
-                "navn": a.get("aksjonærnavn"),
-                "nr": a.get("aksjonærnr"),
-                "poststed": a.get("poststed"),
-                "landkode": a.get("landkode"),
-            },
-            "antallaksjer": a.get("antallaksjer"),
-            "antallaksjerselskap": a.get("antallaksjerselskap"),
-        })
-        if len(bulk) >= 2000:
-            dst.insert_many(bulk)
-            bulk = []
-    if bulk:
-        dst.insert_many(bulk)
-
-
-def _build_politikere(raw, structured):
-    src = raw["politikere"]
-    dst = structured["politikere"]
-
-    dst.create_index([("navn", ASCENDING)])
-    dst.create_index([("parti", ASCENDING)])
-    dst.create_index([("kommunenr", ASCENDING)])
-
-    docs = []
-    for p in src.find({}):
-        docs.append({
-            "navn": p.get("navn"),
-            "parti": p.get("parti"),
-            "kommunenr": p.get("kommunenr"),
-            "kommune": p.get("kommune"),
-            "foedselsdato": p.get("fødselsdato"),
-            "listeplass": p.get("listeplass"),
-            "stemmetillegg": p.get("stemmetillegg"),
-            "personstemmer": p.get("persontemmer"),
-            "slengere": p.get("slengere"),
-            "endeligrangering": p.get("endeligrangering"),
-            "innvalgt": p.get("innvalgt"),
-        })
-    if docs:
-        dst.insert_many(docs)
+        while fp is not None and fp["_id"] < value:
+            fp = next(fps, None)
+        yield value, fp["fp"] if fp is not None and fp["_id"] == value else None
+
+
+def _diff(source, target) -> tuple[dict, list]:
+    """Merge two (key, fingerprint) streams sorted by key.
+
+    Returns ({key to upsert: its fingerprint}, keys to delete). A source without a fingerprint
+    is always upserted.
+    """
+    upserts, deletes = {}, []
+    src, dst = next(source, None), next(target, None)
+    while src is not None or dst is not None:
+        if dst is None or (src is not None and src[0] < dst[0]):
+            upserts[src[0]] = src[1]  # type: ignore[index]
+            src = next(source, None)
+        elif src is None or dst[0] < src[0]:
+            deletes.append(dst[0])
+            dst = next(target, None)
+        else:
+            if src[1] is None or src[1] != dst[1]:
+                upserts[src[0]] = src[1]
+            src, dst = next(source, None), next(target, None)
+    return upserts, deletes
+
+
+def _apply_changes(coll, docs, deletes: list, stale: list, write_concern=None, key: str = "_id") -> tuple[int, int]:
+    # docs yields (document, fingerprint). Deletes go first, so a unique index never sees the old
+    # and the new document at once. Fingerprints are stored after their documents, so an
+    # interrupted sync rewrites a document rather than skipping it.
+    fp_coll = _fp_collection(coll)
+    deleted = write_ops(coll, (DeleteOne({key: k}) for k in deletes), write_concern)
+    deleted += write_ops(coll, (DeleteOne({"_id": i}) for i in stale), write_concern)
+    write_ops(fp_coll, (DeleteOne({"_id": k}) for k in deletes), write_concern)
+
+    fps = []
+
+    def replacements():
+        for doc, fp in docs:
+            fps.append((doc[key], fp))
+            yield ReplaceOne({key: doc[key]}, doc, upsert=True)
+
+    upserted = write_ops(coll, replacements(), write_concern)
+    write_ops(fp_coll, (ReplaceOne({"_id": k}, {"_id": k, "fp": fp}, upsert=True) for k, fp in fps), write_concern)
+    return upserted, deleted
+
+
+def _resync_view(pg, coll, table: str, write_concern=None) -> tuple[int, int]:
+    # A view has no ctids to key its rows on, so it is copied again whole, as a full build does
+    deleted = coll.delete_many({}).deleted_count
+    _fp_collection(coll).drop()
+    with pg.cursor(name=f"sync_{table}") as cur:
+        cur.itersize = FETCH_SIZE
+        cur.execute(sql.SQL("SELECT * FROM {}").format(sql.SQL(table)))
+        convert = make_row_converter(cur.description)
+        with BulkWriter(coll, write_concern) as writer:
+            for row in cur:
+                writer.add(convert(row))
+    return writer.inserted, deleted
+
+
+def _sync_rows(rel_index: int, relation: str) -> sql.Composable:
+    # Same _id and columns as the full copy's task query, plus the row's md5 as _fp
+    return sql.SQL("SELECT {} AS _id, md5(t::text) AS _fp, t.* FROM ONLY {} t").format(
+        sql.SQL(_row_id(rel_index)), sql.SQL(relation)
+    )
+
+
+def _sync_table(pg_conninfo: dict, mongo, table: str, write_concern=None) -> tuple[int, int]:
+    coll = mongo[table]
+    with psycopg.connect(**pg_conninfo) as pg:
+        # Every read below sees one snapshot, so row ids, fingerprints and fetched rows agree
+        pg.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        pg.read_only = True
+
+        kind = _relkind(pg, table)
+        if kind is None:
+            raise ValueError(f"relation '{table}' does not exist in Postgres")
+        if kind not in ("r", "p"):
+            return _resync_view(pg, coll, table, write_concern)
+        relations = [relation for relation, _, _ in _leaf_relations(pg, table)]
+        if not relations:
+            raise ValueError(f"'{table}' has no partitions to sync")
+
+        # Rows are keyed by the full copy's row ids; a ctid reused for another row after VACUUM
+        # keeps its _id but changes its fingerprint
+        rows = sql.SQL(" UNION ALL ").join(_sync_rows(i, relation) for i, relation in enumerate(relations))
+        with pg.cursor(name=f"sync_{table}") as cur:
+            cur.itersize = FETCH_SIZE
+            cur.execute(sql.SQL("SELECT _id, _fp FROM ({}) s ORDER BY _id").format(rows))
+            stale = []
+            upserts, deletes = _diff(iter(cur), _fingerprints(coll, stale))
+
+        def changed_docs():
+            # Row ids map back to ctids, so changed rows are fetched with TID scans
+            tids = {}
+            for row_id in upserts:
+                tids.setdefault(row_id >> 48, []).append(f"({(row_id >> 16) & 0xFFFFFFFF},{row_id & 0xFFFF})")
+            for rel_index, rel_tids in tids.items():
+                with pg.cursor(name=f"sync_{table}_{rel_index}") as cur:
+                    cur.itersize = FETCH_SIZE
+                    cur.execute(
+                        sql.SQL("{} WHERE ctid = ANY(%s::tid[])").format(_sync_rows(rel_index, relations[rel_index])),
+                        (rel_tids,),
+                    )
+                    convert = make_row_converter(cur.description)
+                    for row in cur:
+                        doc = convert(row)
+                        yield doc, doc.pop("_fp")
+
+        return _apply_changes(coll, changed_docs(), deletes, stale, write_concern)
+
+
+def _sync_reshape(raw, dst, fields: dict, write_concern=None) -> tuple[int, int]:
+    # A reshaped document keeps the _id of its raw document, as the pushdown engine writes it,
+    # and the fingerprint of its raw row
+    src = raw[dst.name]
+    stale = []
+    upserts, deletes = _diff(_fingerprints(src, []), _fingerprints(dst, stale))
+    keys = list(upserts)
+
+    def changed_docs():
+        for i in range(0, len(keys), SYNC_LOOKUP_BATCH):
+            for doc in src.find({"_id": {"$in": keys[i:i + SYNC_LOOKUP_BATCH]}}):
+                yield {"_id": doc["_id"], **reshape_doc(fields, doc)}, upserts[doc["_id"]]
+
+    return _apply_changes(dst, changed_docs(), deletes, stale, write_concern)
+
+
+def _person_groups(rows):
+    # (uuid, rows) for rows sorted by (uuid, _id)
+    uuid, group = None, []
+    for row in rows:
+        if group and row["uuid"] != uuid:
+            yield uuid, group
+            group = []
+        uuid = row["uuid"]
+        group.append(row)
+    if group:
+        yield uuid, group
+
+
+def _group_fingerprint(group) -> str | None:
+    fps = [row.get("_fp") for row in group]
+    if None in fps:
+        return None
+    return hashlib.md5("".join(fps).encode()).hexdigest()
+
+
+def _sync_person(raw, dst, write_concern=None) -> tuple[int, int]:
+    # A person is matched on uuid, and its fingerprint covers the fingerprints of all its raw rows.
+    # Documents are rebuilt like _build_person: roles in (uuid, _id) order, _id left to Mongo.
+    src = raw["person"]
+    src.create_index([("uuid", ASCENDING), ("_id", ASCENDING)])
+    has_uuid = {"uuid": {"$nin": [None, ""]}}
+    order = [("uuid", ASCENDING), ("_id", ASCENDING)]
+
+    rows = src.aggregate([
+        {"$match": has_uuid},
+        {"$sort": dict(order)},
+        {"$project": {"uuid": True}},
+        {"$lookup": {"from": _fp_collection(src).name, "localField": "_id", "foreignField": "_id", "as": "fp"}},
+        {"$project": {"uuid": True, "_fp": {"$arrayElemAt": ["$fp.fp", 0]}}},
+    ], allowDiskUse=True)
+    source = ((uuid, _group_fingerprint(group)) for uuid, group in _person_groups(rows))
+    stale = []
+    upserts, deletes = _diff(source, _fingerprints(dst, stale, key="uuid", key_type=str))
+    keys = list(upserts)
+
+    def changed_docs():
+        for i in range(0, len(keys), SYNC_LOOKUP_BATCH):
+            batch = src.find({"uuid": {"$in": keys[i:i + SYNC_LOOKUP_BATCH]}}).sort(order)
+            for uuid, group in _person_groups(batch):
+                person = _person_doc(group[0])
+                person["roles"] = [reshape_doc(PERSON_ROLE_FIELDS, row) for row in group]
+                yield person, upserts[uuid]
+
+    return _apply_changes(dst, changed_docs(), deletes, stale, write_concern, key="uuid")
+
+
+def _run_sync(label: str, tasks: dict) -> bool:
+    failed = {}
+    with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+        futures = {pool.submit(task): name for name, task in tasks.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                upserted, deleted = future.result()
+                print(f"[SYNC] {label}.{name}: {upserted} upserted, {deleted} deleted")
+            except Exception as e:
+                failed[name] = e
+
+    if failed:
+        print(f"[ERROR] {len(failed)} of {len(tasks)} {label} collections failed to sync:")
+        for name, e in failed.items():
+            print(f" - {name}: {e}")
+        return False
+    return True
+
+
+def sync_copy(pg_conninfo: dict, mongo_dbname: str, tables: list[str], write_concern: dict | None = None) -> bool:
+    """Bring the raw copy up to date with Postgres, writing only rows whose fingerprint changed."""
+    print(f"[INFO] Syncing tables to Mongo database '{mongo_dbname}'")
+    client = MongoClient(get_mongo_uri())
+    mongo = client[mongo_dbname]
+    ok = _run_sync(mongo_dbname, {
+        table: partial(_sync_table, pg_conninfo, mongo, table, write_concern) for table in tables
+    })
+    client.close()
+    return ok
+
+
+def sync_structured(raw_dbname: str, structured_dbname: str, write_concern: dict | None = None) -> bool:
+    """Bring the structured collections up to date with a synced raw copy."""
+    print(f"[INFO] Syncing '{raw_dbname}' -> '{structured_dbname}'")
+    client = MongoClient(get_mongo_uri())
+    raw = client[raw_dbname]
+    structured = client[structured_dbname]
+
+    tasks = {
+        name: partial(_sync_reshape, raw, structured[name], fields, write_concern)
+        for name, fields in RESHAPES.items()
+    }
+    tasks["person"] = partial(_sync_person, raw, structured["person"], write_concern)
+    ok = _run_sync(structured_dbname, tasks)
+
+    if ok:
+        for name in STRUCTURED_COLLECTIONS:
+            if INDEXES[name]:
+                structured[name].create_indexes(INDEXES[name])
+    client.close()
+    return ok
 
 
 # ----------------------------
 # Orchestration
 # ----------------------------
 
-def build(version: str, mode: str) -> bool:
+def build(version: str, mode: str, resume: bool = False) -> bool:
     cfg = load_version(version)
     if not cfg:
         return False
@@ -302,18 +1180,39 @@ def build(version: str, mode: str) -> bool:
     target_copy = cfg["target_mongo_copy"]
     target_structured = cfg["target_mongo_structured"]
     tables = cfg.get("tables", [])
+    write_concern = cfg.get("write_concern")
+    copy_options = {
+        "workers": cfg.get("copy_workers", 4),
+        "split_rows": cfg.get("copy_split_rows", SPLIT_ROWS),
+        "engine": cfg.get("copy_engine", "cursor"),
+        "write_concern": write_concern,
+        "resume": resume,
+    }
+    structured_engine = cfg.get("structured_engine", "python")
+    if structured_engine not in STRUCTURED_ENGINES:
+        print(f"[ERROR] Unknown structured_engine '{structured_engine}'. Use one of: {', '.join(STRUCTURED_ENGINES)}")
+        return False
 
     print(f"[INFO] Using Postgres '{source_pg}', mode='{mode}'")
 
     if mode == "copy":
-        build_copy(get_pg_conninfo(source_pg), target_copy, tables)
+        return build_copy(get_pg_conninfo(source_pg), target_copy, tables, **copy_options)
     elif mode == "structured":
-        build_structured(target_copy, target_structured)
+        return build_structured(target_copy, target_structured, write_concern, structured_engine)
     elif mode == "all":
-        build_copy(get_pg_conninfo(source_pg), target_copy, tables)
-        build_structured(target_copy, target_structured)
+        if not build_copy(get_pg_conninfo(source_pg), target_copy, tables, **copy_options):
+            return False
+        return build_structured(target_copy, target_structured, write_concern, structured_engine)
+    elif mode == "direct":
+        return build_direct(get_pg_conninfo(source_pg), target_structured, write_concern)
+    elif mode == "sync":
+        if not sync_copy(get_pg_conninfo(source_pg), target_copy, tables, write_concern):
+            return False
+        return sync_structured(target_copy, target_structured, write_concern)
+    elif mode == "compare":
+        return compare_structured(target_copy, target_structured, write_concern)
     else:
-        print("[ERROR] Unknown mode. Use 'copy', 'structured', or 'all'.")
+        print("[ERROR] Unknown mode. Use 'copy', 'structured', 'all', 'direct', 'sync' or 'compare'.")
         return False
 
     return True
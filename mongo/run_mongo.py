@@ -1,20 +1,21 @@
 import sys
+import argparse
 from main import build
 
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: python run_mongo.py <version> <mode: copy|structured|all>")
-        sys.exit(1)
-
-    version = sys.argv[1]
-    mode = sys.argv[2]
+    parser = argparse.ArgumentParser(description="Build MongoDB from Postgres")
+    parser.add_argument("version", help="version YAML in mongo/versions")
+    parser.add_argument("mode", choices=["copy", "structured", "all", "direct", "sync", "compare"])
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted raw copy from its checkpoints instead of starting over")
+    args = parser.parse_args()
 
-    print(f"\n=== MongoDB build: version='{version}', mode='{mode}' ===")
-    ok = build(version, mode)
+    print(f"\n=== MongoDB build: version='{args.version}', mode='{args.mode}' ===")
+    ok = build(args.version, args.mode, args.resume)
     if not ok:
         sys.exit(1)
-    print(f"=== Completed Mongo build: {version} ({mode}) ===\n")
+    print(f"=== Completed Mongo build: {args.version} ({args.mode}) ===\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,293 @@
+import re
+import sys
+import argparse
+from pathlib import Path
+
+import psycopg
+from psycopg import sql
+
+from main import connect_db, load_version_config
+from queries.queries import load_queries
+from schema import split_statements
+
+
+DEFAULT_OUTPUT = Path(__file__).parent / "schemas" / "indexes_advised.sql"
+EXISTING_INDEXES = Path(__file__).parent / "schemas" / "indexes.sql"
+
+CONDITION_KEYS = ("Filter", "Hash Cond", "Merge Cond", "Join Filter", "Recheck Cond")
+DML_PREFIXES = ("select", "with", "delete", "update", "insert")
+
+# Column reference as printed by EXPLAIN VERBOSE, optionally wrapped in a cast: (alias.col)::text
+COLUMN = r"\(?(?<![\w.]){alias}\.(\w+)\)?(?:::[\w ]+?(?:\(\d+\))?)?"
+COMPARISON = r"(?:=|<>|<=|>=|<|>)"
+
+
+def load_workload(config):
+    workload = [(name, query) for name, query in load_queries().items()]
+
+    for sql_file in config.get("post_load_sql", []):
+        sql_path = Path(sql_file)
+        if not sql_path.exists():
+            continue
+        for i, stmt in enumerate(split_statements(sql_path.read_text(encoding="utf-8")), 1):
+            if stmt.lower().startswith(DML_PREFIXES):
+                workload.append((f"{sql_path.name}#{i}", stmt))
+
+    return workload
+
+
+def explain(cur, stmt, analyze=False):
+    options = "ANALYZE, VERBOSE, FORMAT JSON" if analyze else "VERBOSE, FORMAT JSON"
+    cur.execute(f"EXPLAIN ({options}) {stmt}")
+    return cur.fetchone()[0][0]
+
+
+def walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def measure(conn, stmt, runs):
+    # Best of several runs; DML is rolled back, so the workload can be replayed
+    best = None
+    for _ in range(runs):
+        with conn.cursor() as cur:
+            result = explain(cur, stmt, analyze=True)
+        conn.rollback()
+        elapsed = result["Execution Time"]
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def estimated_cost(cur, stmt):
+    return explain(cur, stmt)["Plan"]["Total Cost"]
+
+
+def _reltuples(cur, table, cache):
+    if table not in cache:
+        cur.execute("SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+        row = cur.fetchone()
+        if row and row[0] < 0:
+            # Never analyzed (reltuples is -1 since PG14), so count instead of guessing
+            cur.execute(sql.SQL("SELECT count(*) FROM {}").format(sql.Identifier(table)))
+            row = cur.fetchone()
+        cache[table] = row[0] if row else 0
+    return cache[table]
+
+
+def _root_table(cur, table, cache):
+    # Scans of a partition propose indexes on the partitioned table they belong to
+    if table not in cache:
+        cur.execute(
+            "SELECT relname FROM pg_class WHERE oid = coalesce(pg_partition_root(to_regclass(%s)), to_regclass(%s))",
+            (table, table),
+        )
+        row = cur.fetchone()
+        cache[table] = row[0] if row and row[0] else table
+    return cache[table]
+
+
+def _candidate(table, name, definition, kind):
+    name = name.lower()
+    return {
+        "table": table,
+        "name": name,
+        "kind": kind,
+        "definition": definition,
+        "ddl": f"create index if not exists {name} on {table} {definition}",
+    }
+
+
+def find_candidates(cur, plan, min_rows, reltuples_cache, root_cache):
+    """Propose indexes for sequential scans on large relations in one plan."""
+    nodes = list(walk(plan["Plan"]))
+    conditions = [node[key] for node in nodes for key in CONDITION_KEYS if key in node]
+    candidates = {}
+
+    for node in nodes:
+        if node.get("Node Type") != "Seq Scan":
+            continue
+        relation = node["Relation Name"]
+        table = _root_table(cur, relation, root_cache)
+        if _reltuples(cur, table, reltuples_cache) < min_rows:
+            continue
+
+        alias = re.escape(node.get("Alias", relation))
+        col_re = COLUMN.format(alias=alias)
+        outputs = [out.split(".", 1)[-1] for out in node.get("Output", [])]
+
+        for cond in conditions:
+            for col in re.findall(rf"{col_re}\s+~~\*?\s+'%", cond):
+                candidates[f"{table}.{col}.trgm"] = _candidate(
+                    table, f"{table}_{col}_trgm_idx", f"using gin ({col} gin_trgm_ops)", "trgm"
+                )
+            for col in re.findall(rf"upper\({col_re}\)", cond):
+                candidates[f"{table}.{col}.upper"] = _candidate(
+                    table, f"{table}_upper_{col}_idx", f"(upper({col}))", "expression"
+                )
+            compared = re.findall(rf"{col_re}\s*{COMPARISON}", cond)
+            compared += re.findall(rf"{COMPARISON}\s*{col_re}", cond)
+            for col in compared:
+                candidates[f"{table}.{col}.btree"] = _candidate(
+                    table, f"{table}_{col}_idx", f"({col})", "btree"
+                )
+                others = [out for out in outputs if out.lower() != col.lower() and re.fullmatch(r"\w+", out)]
+                if others and len(others) <= 3:
+                    candidates[f"{table}.{col}.covering"] = _candidate(
+                        table, f"{table}_{col}_covering_idx",
+                        f"({col}) include ({', '.join(others)})", "covering"
+                    )
+
+    return list(candidates.values())
+
+
+def _normalize_index(definition):
+    definition = definition.lower().replace("using btree", "").replace("::text", "")
+    return re.sub(r"[\s()]", "", definition)
+
+
+def _already_indexed(cur, candidate):
+    cur.execute("SELECT indexdef FROM pg_indexes WHERE tablename = %s", (candidate["table"].lower(),))
+    target = _normalize_index(candidate["definition"])
+    for (indexdef,) in cur.fetchall():
+        # CREATE INDEX name ON [ONLY] public.table USING btree (col); ONLY marks a partitioned table
+        definition = indexdef.split(" ON ", 1)[1].removeprefix("ONLY ").split(" ", 1)[1]
+        if _normalize_index(definition) == target:
+            return True
+    return False
+
+
+def _hypopg_available(cur):
+    cur.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'hypopg'")
+    return cur.fetchone() is not None
+
+
+def screen_hypothetical(conn, candidate, stmts):
+    # Cheap check with a hypothetical index; None when hypopg cannot model this index
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS hypopg")
+            before = {label: estimated_cost(cur, stmt) for label, stmt in stmts}
+            cur.execute("SELECT * FROM hypopg_create_index(%s)", (candidate["ddl"],))
+            after = {label: estimated_cost(cur, stmt) for label, stmt in stmts}
+            cur.execute("SELECT hypopg_reset()")
+        conn.rollback()
+    except psycopg.Error:
+        conn.rollback()
+        return None
+    return any(after[label] < before[label] for label in before)
+
+
+def evaluate(conn, candidate, stmts, baseline, runs):
+    # Temporary real build inside a transaction that is rolled back after measuring
+    timings = {}
+    with conn.cursor() as cur:
+        if candidate["kind"] == "trgm":
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cur.execute(candidate["ddl"])
+        for label, stmt in stmts:
+            best = None
+            for _ in range(runs):
+                cur.execute("SAVEPOINT advisor_run")
+                elapsed = explain(cur, stmt, analyze=True)["Execution Time"]
+                cur.execute("ROLLBACK TO SAVEPOINT advisor_run")
+                best = elapsed if best is None else min(best, elapsed)
+            timings[label] = (baseline[label], best)
+    conn.rollback()
+    return timings
+
+
+def write_indexes(output, results, min_speedup):
+    lines = [
+        EXISTING_INDEXES.read_text(encoding="utf-8").strip(),
+        "",
+        "-- Advised by postgres/advisor.py, with the measured execution time",
+        "-- of every statement each index speeds up",
+    ]
+    if any(c["kind"] == "trgm" for c, _ in results):
+        lines.append("create extension if not exists pg_trgm;")
+
+    for candidate, timings in results:
+        useful = {
+            label: (before, after) for label, (before, after) in timings.items()
+            if after > 0 and before / after >= min_speedup
+        }
+        if not useful:
+            continue
+        for label, (before, after) in sorted(useful.items()):
+            lines.append(f"-- {label}: {before:.1f} ms -> {after:.1f} ms ({before / after:.1f}x)")
+        lines.append(f"{candidate['ddl']};")
+
+    Path(output).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def advise(version_name, output=DEFAULT_OUTPUT, min_rows=10_000, runs=3, min_speedup=1.2):
+    config = load_version_config(version_name)
+    if not config:
+        return False
+
+    workload = load_workload(config)
+    print(f"Explaining {len(workload)} statements against '{config['database']}'")
+
+    with connect_db(config["database"]) as conn:
+        with conn.cursor() as cur:
+            use_hypopg = _hypopg_available(cur)
+
+        candidates = {}
+        sources = {}
+        reltuples_cache = {}
+        root_cache = {}
+        for label, stmt in workload:
+            try:
+                with conn.cursor() as cur:
+                    plan = explain(cur, stmt)
+                    found = find_candidates(cur, plan, min_rows, reltuples_cache, root_cache)
+                    found = [c for c in found if not _already_indexed(cur, c)]
+            except psycopg.Error as e:
+                print(f"  - {label}: EXPLAIN failed: {e}")
+                conn.rollback()
+                continue
+            conn.rollback()
+            for candidate in found:
+                candidates[candidate["name"]] = candidate
+                sources.setdefault(candidate["name"], []).append((label, stmt))
+
+        print(f"Found {len(candidates)} candidate indexes")
+        statements = {label: stmt for group in sources.values() for label, stmt in group}
+        baseline = {label: measure(conn, stmt, runs) for label, stmt in statements.items()}
+
+        results = []
+        for name, candidate in candidates.items():
+            stmts = sources[name]
+            if use_hypopg and screen_hypothetical(conn, candidate, stmts) is False:
+                print(f"  - {name}: no cost improvement with a hypothetical index, skipped")
+                continue
+            try:
+                timings = evaluate(conn, candidate, stmts, baseline, runs)
+            except psycopg.Error as e:
+                print(f"  - {name}: build failed: {e}")
+                conn.rollback()
+                continue
+            best = max(before / max(after, 1e-6) for before, after in timings.values())
+            print(f"  - {name}: up to {best:.1f}x")
+            results.append((candidate, timings))
+
+    write_indexes(output, results, min_speedup)
+    print(f"Advised indexes written to {output}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Propose and measure indexes for the ground-truth workload")
+    parser.add_argument("version_name")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="where to write the index script")
+    parser.add_argument("--min-rows", type=int, default=10_000,
+                        help="ignore sequential scans on relations smaller than this")
+    parser.add_argument("--runs", type=int, default=3, help="timed runs per statement, best is kept")
+    parser.add_argument("--min-speedup", type=float, default=1.2,
+                        help="only keep indexes that speed some statement up by this factor")
+    args = parser.parse_args()
+
+    if not advise(args.version_name, args.output, args.min_rows, args.runs, args.min_speedup):
+        sys.exit(1)
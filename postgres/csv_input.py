@@ -0,0 +1,129 @@
+import io
+import bz2
+import gzip
+import lzma
+import queue
+import threading
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DECOMPRESS_BLOCK_SIZE = 1 << 20
+DECOMPRESS_QUEUE_DEPTH = 8
+
+OPENERS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+
+def _open_zstd(path, mode="rb"):
+    if zstandard is None:
+        raise ImportError("Reading .zst files requires the 'zstandard' package")
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True, read_across_frames=True)
+
+
+OPENERS[".zst"] = _open_zstd
+
+
+def is_compressed(path):
+    return Path(path).suffix.lower() in OPENERS
+
+
+class ThreadedReader(io.RawIOBase):
+    """Reads a decompressing stream on a background thread, a bounded number of blocks ahead.
+
+    zlib, bz2, lzma and zstandard release the GIL while decompressing, so this overlaps
+    with whatever the consumer does with the previous blocks (e.g. sending them to COPY).
+    """
+
+    def __init__(self, stream, block_size=DECOMPRESS_BLOCK_SIZE, depth=DECOMPRESS_QUEUE_DEPTH):
+        self._stream = stream
+        self._block_size = block_size
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._pending = b""
+        self._offset = 0
+        self._delivered = 0
+        self._eof = False
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fill(self):
+        try:
+            while block := self._stream.read(self._block_size):
+                if not self._put(block):
+                    return
+        except Exception as e:
+            self._put(e)
+            return
+        self._put(None)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._offset >= len(self._pending):
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if item is None:
+                self._eof = True
+                return 0
+            if isinstance(item, Exception):
+                raise item
+            self._pending = item
+            self._offset = 0
+
+        n = min(len(b), len(self._pending) - self._offset)
+        b[:n] = self._pending[self._offset:self._offset + n]
+        self._offset += n
+        self._delivered += n
+        return n
+
+    def tell(self):
+        return self._delivered
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._stream.close()
+        super().close()
+
+
+def open_csv(path, text=True, encoding="utf-8", newline=None):
+    """Open a CSV, decompressing .gz/.bz2/.xz/.zst files on a background thread."""
+    path = Path(path)
+    opener = OPENERS.get(path.suffix.lower())
+
+    if opener is None:
+        if text:
+            return open(path, encoding=encoding, newline=newline)
+        return open(path, "rb")
+
+    raw = io.BufferedReader(ThreadedReader(opener(path, "rb")), buffer_size=DECOMPRESS_BLOCK_SIZE)
+    if text:
+        return io.TextIOWrapper(raw, encoding=encoding, newline=newline)
+    return raw
+
+
+def bytes_read(f):
+    # Uncompressed bytes consumed so far, taken from the raw stream under any buffering
+    raw = getattr(f, "buffer", f)
+    raw = getattr(raw, "raw", raw)
+    return raw.tell()
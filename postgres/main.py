@@ -1,9 +1,20 @@
 import os
+import re
+import time
 import yaml
 import psycopg
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from psycopg import sql
 
+from csv_input import open_csv, bytes_read
+from manifest import plan_build, write_manifest
+from validate import validate_tables
+from schema import (
+    parse_create_table, render_create_table, project_columns, parse_indexes, render_create_index,
+    partition_name, partition_suffixes, render_partitions, split_statements,
+)
+
 
 def get_connection_info(dbname=None):
     conninfo = {}
@@ -32,9 +43,9 @@ def get_connection_info(dbname=None):
     return conninfo
 
 
-def connect_db(dbname):
+def connect_db(dbname, autocommit=False):
     conninfo = get_connection_info(dbname)
-    return psycopg.connect(**conninfo)
+    return psycopg.connect(**conninfo, autocommit=autocommit)
 
 
 def load_version_config(version_name):
@@ -72,34 +83,435 @@ def run_sql_file(cur, filepath):
         cur.execute(f.read())
 
 
-def load_table(cur, name, schema_path, csv_path, delimiter=",", drop_cols=None, date_style=None):
-    print(f"Loading table: {name}")
+COPY_BLOCK_SIZE = 1 << 20
+
+
+def _copy_lines(copy, csv_path, skip_lines=None):
+    with open_csv(csv_path) as f:
+        if skip_lines:
+            # Drops quarantined rows; line numbers are 1-based and include the header
+            for line_no, line in enumerate(f, 1):
+                if line_no not in skip_lines:
+                    copy.write(line)
+        else:
+            for line in f:
+                copy.write(line)
+        return bytes_read(f)
+
+
+def _copy_blocks(copy, csv_path, block_size=COPY_BLOCK_SIZE):
+    # Raw bytes go straight to the server; it splits rows itself, so nothing is decoded here
+    nbytes = 0
+    with open_csv(csv_path, text=False) as f:
+        while block := f.read(block_size):
+            copy.write(block)
+            nbytes += len(block)
+    return nbytes
+
+
+def _report_copy(name, nbytes, rows, elapsed):
+    elapsed = max(elapsed, 1e-9)
+    print(
+        f"  - Copied {rows:,} rows, {nbytes / 1e6:,.1f} MB into '{name}' in {elapsed:.1f}s "
+        f"({rows / elapsed:,.0f} rows/s, {nbytes / 1e6 / elapsed:,.1f} MB/s)"
+    )
+
+
+STAGING_SUFFIX = "__staging"
+
+
+def staging_name(name):
+    return f"{name}{STAGING_SUFFIX}"
+
+
+def _relkind(cur, name):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);", (name,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def load_table(cur, name, schema_path, csv_path, delimiter=",", drop_cols=None, date_style=None,
+               copy_mode="block", staging=False, skip_lines=None, partition_by=None, load_partitions=None):
+    table = staging_name(name) if staging else name
+    print(f"Loading table: {table}")
     
     if date_style:
         cur.execute(f"SET datestyle = {date_style};")
     
-    with open(schema_path, encoding="utf-8") as f:
-        cur.execute(f.read())
+    _, columns = parse_create_table(schema_path)
+    _, kept_columns, unknown = project_columns(columns, drop_cols)
+    for col in unknown:
+        print(f"WARNING: drop_cols entry '{col}' is not a column of '{name}'")
     
-    cur.execute(sql.SQL("TRUNCATE {} RESTART IDENTITY;").format(sql.Identifier(name)))
+    part_filter = None
+    copy_target = table
+    if partition_by:
+        part_col = partition_by["column"].lower()
+        if part_col not in {col.lower() for col, _ in kept_columns}:
+            raise ValueError(f"Partition column '{partition_by['column']}' is not loaded into '{name}'")
+        if staging:
+            load_partitions = None
+        if load_partitions:
+            # Only rows for the selected partitions are kept; nothing else is touched
+            part_filter = sql.SQL(" WHERE {} = ANY(%s)").format(sql.SQL(partition_by["column"]))
+            if len(set(load_partitions)) == 1:
+                copy_target = partition_name(table, load_partitions[0])
     
-    if not csv_path.exists():
-        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+    if staging:
+        # Staging tables are unlogged and always start fresh
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(sql.Identifier(table)))
+    elif _relkind(cur, table) not in (None, "p" if partition_by else "r"):
+        # Left by a build with the other layout (partitioned or not), so it cannot be reused
+        print(f"  - Recreating '{table}' with a new partitioning layout")
+        cur.execute(sql.SQL("DROP TABLE {} CASCADE;").format(sql.Identifier(table)))
     
-    copy_sql = f"COPY {name} FROM STDIN WITH (FORMAT CSV, HEADER, DELIMITER '{delimiter}')"
+    # The parent of a partitioned table cannot be unlogged; its partitions are
+    cur.execute(render_create_table(
+        table, kept_columns, unlogged=staging and not partition_by, partition_by=partition_by
+    ))
     
-    with open(csv_path, encoding="utf-8") as f, cur.copy(copy_sql) as copy:
-        for line in f:
-            copy.write(line)
+    if partition_by:
+        default = partition_name(table, "default")
+        if not load_partitions:
+            # Emptied before partitions are added, so the default partition cannot hold their rows
+            cur.execute(sql.SQL("TRUNCATE {} RESTART IDENTITY;").format(sql.Identifier(table)))
+        elif _relkind(cur, default):
+            # Rows for a year that is getting its own partition must leave the default one first
+            cur.execute(
+                sql.SQL("DELETE FROM {} WHERE {} = ANY(%s);").format(
+                    sql.Identifier(default), sql.SQL(partition_by["column"])
+                ),
+                (list(load_partitions),),
+            )
+        for stmt in render_partitions(table, partition_by, unlogged=staging):
+            cur.execute(stmt)
+    
+    if load_partitions:
+        truncate = sql.SQL(", ").join(
+            sql.Identifier(partition_name(table, value)) for value in load_partitions
+        )
+        cur.execute(sql.SQL("TRUNCATE {};").format(truncate))
+    elif not partition_by:
+        cur.execute(sql.SQL("TRUNCATE {} RESTART IDENTITY;").format(sql.Identifier(table)))
     
     if drop_cols:
+        # Tables created by older builds still carry the dropped columns; the table is empty here
         drops = ", ".join([f"DROP COLUMN IF EXISTS {col}" for col in drop_cols])
-        cur.execute(f"ALTER TABLE {name} {drops};")
+        cur.execute(f"ALTER TABLE {table} {drops};")
+    
+    if not csv_path.exists():
+        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+    
+    projected = bool(drop_cols or part_filter)
+    load_target = copy_target
+    if projected:
+        # The CSV is block-copied as is into a full-width temp table (never WAL-logged), and the
+        # server picks the kept columns and rows from there
+        load_target = f"{table}__load"
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(sql.Identifier(load_target)))
+        cur.execute(render_create_table(load_target, columns, temporary=True))
+    copy_sql = f"COPY {load_target} FROM STDIN WITH (FORMAT CSV, HEADER, DELIMITER '{delimiter}')"
+    
+    if skip_lines and copy_mode == "block":
+        # Quarantined rows can only be left out line by line
+        copy_mode = "line"
+    
+    if copy_mode == "block":
+        # The file is sent undecoded, so the server must read it as UTF-8
+        cur.execute("SET client_encoding = 'UTF8';")
+    
+    start = time.perf_counter()
+    with cur.copy(copy_sql) as copy:
+        if copy_mode == "block":
+            nbytes = _copy_blocks(copy, csv_path)
+        elif copy_mode == "line":
+            nbytes = _copy_lines(copy, csv_path, skip_lines)
+        else:
+            raise ValueError(f"Unknown copy mode: {copy_mode}")
+    # Rows as counted by the server: a quoted field may span several lines
+    _report_copy(load_target, nbytes, cur.rowcount, time.perf_counter() - start)
+    
+    if projected:
+        col_list = sql.SQL(", ").join(sql.SQL(col) for col, _ in kept_columns)
+        cur.execute(
+            sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {}{};").format(
+                sql.Identifier(copy_target), col_list, col_list, sql.Identifier(load_target),
+                part_filter or sql.SQL(""),
+            ),
+            (list(load_partitions),) if part_filter else None,
+        )
+        print(f"  - Kept {cur.rowcount:,} rows, {len(kept_columns)} of {len(columns)} columns, in '{copy_target}'")
+        cur.execute(sql.SQL("DROP TABLE {};").format(sql.Identifier(load_target)))
+    
+    print(f"  - Table '{table}' loaded")
+
+
+def _load_table_args(table_cfg, **options):
+    return dict(
+        name=table_cfg["name"],
+        schema_path=table_cfg["schema"],
+        csv_path=table_cfg["file"],
+        delimiter=table_cfg.get("delimiter", ","),
+        drop_cols=table_cfg.get("drop_cols"),
+        date_style=table_cfg.get("date_style"),
+        skip_lines=table_cfg.get("skip_lines"),
+        partition_by=table_cfg.get("partition_by"),
+        load_partitions=table_cfg.get("load_partitions"),
+        **options,
+    )
+
+
+def load_tables_sequential(cur, tables, **options):
+    failed = []
+    
+    for table_cfg in tables:
+        name = table_cfg["name"]
+        
+        try:
+            cur.execute("SAVEPOINT before_table_load;")
+            load_table(cur=cur, **_load_table_args(table_cfg, **options))
+            
+        except Exception as e:
+            print(f"ERROR: Failed loading table '{name}': {e}")
+            cur.execute("ROLLBACK TO SAVEPOINT before_table_load;")
+            failed.append(name)
+    
+    return failed
+
+
+def _load_table_worker(dbname, table_cfg, options):
+    # Each worker owns its connection, so every table commits or rolls back on its own
+    with connect_db(dbname) as conn, conn.cursor() as cur:
+        load_table(cur=cur, **_load_table_args(table_cfg, **options))
+        conn.commit()
+
+
+def load_tables_parallel(dbname, tables, workers, **options):
+    print(f"Loading {len(tables)} tables with {workers} workers")
+    failed = []
     
-    print(f"  - Table '{name}' loaded")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_load_table_worker, dbname, table_cfg, options): table_cfg["name"]
+            for table_cfg in tables
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                print(f"ERROR: Failed loading table '{name}': {e}")
+                failed.append(name)
+    
+    return failed
+
+
+def run_post_load(cur, post_sql_files):
+    if post_sql_files:
+        print("Running post-load SQL scripts")
+    
+    for sql_file in post_sql_files:
+        sql_path = Path(sql_file)
+        if not sql_path.exists():
+            print(f"WARNING: Post-load SQL file not found: {sql_path}")
+            continue
+        
+        print(f"  - Running: {sql_path.name}")
+        run_sql_file(cur, sql_path)
+
+
+def _split_index_scripts(post_sql_files):
+    # Scripts holding only create index (and create extension) statements can be built on staging
+    index_scripts = []
+    other_scripts = []
+    for sql_file in post_sql_files:
+        sql_path = Path(sql_file)
+        if sql_path.exists():
+            indexes, others = parse_indexes(sql_path)
+            if indexes and all(stmt.lower().startswith("create extension") for stmt in others):
+                index_scripts.append(sql_path)
+                continue
+        other_scripts.append(sql_file)
+    return index_scripts, other_scripts
+
+
+# Table references in DML: the word after FROM, JOIN, USING, UPDATE or INTO
+TABLE_REF_RE = re.compile(r"\b(from|join|using|update|into)\s+(\w+)\b", re.IGNORECASE)
+
 
+def _staging_statements(sql_path, table_names):
+    """Rewrite a DML-only script to run on the staging tables, or return None.
 
-def build_database(version_name):
+    Only scripts whose every table reference is a reloaded table qualify, such as the
+    DELETE in cleanup.sql; anything else runs after the swap.
+    """
+    names = {name.lower(): name for name in table_names}
+    statements = split_statements(Path(sql_path).read_text(encoding="utf-8"))
+    if not statements or not all(stmt.lower().startswith(("delete", "update", "insert")) for stmt in statements):
+        return None
+    for stmt in statements:
+        if any(m.group(2).lower() not in names for m in TABLE_REF_RE.finditer(stmt)):
+            return None
+        # Qualified columns (selskap.uuid) would keep pointing at the live table
+        if any(re.search(rf"\b{re.escape(name)}\s*\.", stmt, re.IGNORECASE) for name in names):
+            return None
+    return [
+        TABLE_REF_RE.sub(lambda m: f"{m.group(1)} {staging_name(names[m.group(2).lower()])}", stmt)
+        for stmt in statements
+    ]
+
+
+def _split_staging_scripts(post_sql_files, table_names):
+    staging_scripts = []
+    other_scripts = []
+    for sql_file in post_sql_files:
+        statements = _staging_statements(sql_file, table_names) if Path(sql_file).exists() else None
+        if statements:
+            staging_scripts.append((sql_file, statements))
+        else:
+            other_scripts.append(sql_file)
+    return staging_scripts, other_scripts
+
+
+def run_staging_scripts(dbname, staging_scripts):
+    if staging_scripts:
+        print("Running post-load SQL scripts on staging tables")
+    with connect_db(dbname) as conn, conn.cursor() as cur:
+        for sql_file, statements in staging_scripts:
+            print(f"  - Running: {Path(sql_file).name}")
+            for stmt in statements:
+                cur.execute(stmt)
+        conn.commit()
+
+
+def _run_statement(dbname, statement):
+    with connect_db(dbname, autocommit=True) as conn:
+        conn.execute(statement)
+
+
+def _run_parallel(dbname, statements, workers):
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_statement, dbname, stmt): stmt for stmt in statements}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"ERROR: Failed running '{futures[future]}': {e}")
+                failed.append(futures[future])
+    return failed
+
+
+def build_staging_indexes(dbname, index_scripts, table_names, workers):
+    names = {name.lower() for name in table_names}
+    extensions = []
+    statements = []
+    built = []
+    
+    for sql_path in index_scripts:
+        indexes, others = parse_indexes(sql_path)
+        extensions.extend(others)
+        for index in indexes:
+            if index["table"].lower() not in names:
+                continue
+            statements.append(render_create_index(
+                index,
+                name=staging_name(index["name"]),
+                table=staging_name(index["table"]),
+                if_not_exists=False,
+            ))
+            built.append(index["name"])
+    
+    for stmt in extensions:
+        _run_statement(dbname, stmt)
+    
+    print(f"Building {len(statements)} indexes on staging tables with {workers} workers")
+    if _run_parallel(dbname, statements, workers):
+        return None
+    return built
+
+
+def drop_staging_tables(dbname, table_names):
+    with connect_db(dbname, autocommit=True) as conn:
+        for name in table_names:
+            conn.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(sql.Identifier(staging_name(name))))
+
+
+def swap_staging_tables(cur, table_names, index_names, partitions=None):
+    # Runs inside the caller's transaction; readers wait on the ACCESS EXCLUSIVE locks taken
+    # here until that transaction commits
+    partitions = partitions or {}
+    for name in table_names:
+        print(f"  - Swapping in: {name}")
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {} CASCADE;").format(sql.Identifier(name.lower())))
+        renames = [(staging_name(name), name)] + [
+            (partition_name(staging_name(name), suffix), partition_name(name, suffix))
+            for suffix in partitions.get(name, [])
+        ]
+        for old, new in renames:
+            cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {};").format(
+                sql.Identifier(old.lower()), sql.Identifier(new.lower())
+            ))
+    for index in index_names:
+        cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {};").format(
+            sql.Identifier(staging_name(index).lower()), sql.Identifier(index.lower())
+        ))
+
+
+def build_database_fast(dbname, tables, post_sql_files, workers=1, **options):
+    table_names = [table_cfg["name"] for table_cfg in tables]
+    partitions = {
+        table_cfg["name"]: partition_suffixes(table_cfg["partition_by"])
+        for table_cfg in tables if table_cfg.get("partition_by")
+    }
+    
+    failed = load_tables_parallel(dbname, tables, workers, staging=True, **options)
+    if failed:
+        print(f"ERROR: Keeping current tables, failed staging loads: {', '.join(sorted(failed))}")
+        drop_staging_tables(dbname, table_names)
+        return False
+    
+    index_scripts, post_sql_files = _split_index_scripts(post_sql_files)
+    staging_scripts, other_scripts = _split_staging_scripts(post_sql_files, table_names)
+    
+    # Table-local fixes run while the tables are still unlogged, and outside the swap's locks
+    try:
+        run_staging_scripts(dbname, staging_scripts)
+    except Exception as e:
+        print(f"ERROR: Keeping current tables, failed post-load script on staging: {e}")
+        drop_staging_tables(dbname, table_names)
+        return False
+    
+    # SET LOGGED rewrites the table and rebuilds its indexes one by one, so it goes first
+    # and the indexes are built afterwards, in parallel
+    print("Marking staging tables logged and analyzing")
+    statements = []
+    for name in table_names:
+        # A partitioned parent holds no data; its partitions are switched one by one
+        logged = [partition_name(staging_name(name), suffix) for suffix in partitions.get(name, [])]
+        alters = "".join(f"ALTER TABLE {t} SET LOGGED; " for t in logged or [staging_name(name)])
+        statements.append(f"{alters}ANALYZE {staging_name(name)};")
+    if _run_parallel(dbname, statements, workers):
+        drop_staging_tables(dbname, table_names)
+        return False
+    
+    index_names = build_staging_indexes(dbname, index_scripts, table_names, workers)
+    if index_names is None:
+        print("ERROR: Keeping current tables, failed building staging indexes")
+        drop_staging_tables(dbname, table_names)
+        return False
+    
+    with connect_db(dbname) as conn, conn.cursor() as cur:
+        swap_staging_tables(cur, table_names, index_names, partitions)
+        # Still under the swap's locks: readers are blocked until the post-load scripts finish
+        run_post_load(cur, other_scripts)
+        conn.commit()
+    
+    return True
+
+
+def build_database(version_name, workers=1, copy_mode="block", fast=False, incremental=False,
+                   validate=False, quarantine=False, reject_dir="rejects"):
     print(f"Loading version config: {version_name}")
     
     config = load_version_config(version_name)
@@ -113,39 +525,54 @@ def build_database(version_name):
     print(f"Building database: {dbname}")
     
     with connect_db(dbname) as conn, conn.cursor() as cur:
-        for table_cfg in tables:
-            name = table_cfg["name"]
-            
-            try:
-                cur.execute("SAVEPOINT before_table_load;")
-                
-                load_table(
-                    cur=cur,
-                    name=name,
-                    schema_path=table_cfg["schema"],
-                    csv_path=table_cfg["file"],
-                    delimiter=table_cfg.get("delimiter", ","),
-                    drop_cols=table_cfg.get("drop_cols"),
-                    date_style=table_cfg.get("date_style"),
-                )
-                
-            except Exception as e:
-                print(f"ERROR: Failed loading table '{name}': {e}")
-                cur.execute("ROLLBACK TO SAVEPOINT before_table_load;")
-        
-        if post_sql_files:
-            print("Running post-load SQL scripts")
+        plan = plan_build(cur, tables, post_sql_files, incremental=incremental)
+    
+    if incremental:
+        skipped = [t["name"] for t in tables if t not in plan.tables]
+        print(f"Unchanged tables skipped: {', '.join(skipped) or 'none'}")
+        if not plan.tables and not plan.scripts:
+            print(f"Database '{dbname}' is up to date")
+            return True
+    
+    tables = plan.tables
+    post_sql_files = plan.scripts
+    
+    if validate or quarantine:
+        results = validate_tables(tables, reject_dir=reject_dir if quarantine else None, report_dir=reject_dir)
+        blocked = [
+            name for name, (errors, skip_lines) in results.items()
+            if errors and (skip_lines is None or not quarantine)
+        ]
+        if blocked:
+            print(f"ERROR: Validation failed, nothing was loaded: {', '.join(blocked)}")
+            return False
+        tables = [{**table_cfg, "skip_lines": results[table_cfg["name"]][1]} for table_cfg in tables]
+    
+    loaded = [table_cfg["name"] for table_cfg in tables]
+    
+    if fast:
+        if not build_database_fast(dbname, tables, post_sql_files, workers, copy_mode=copy_mode):
+            return False
         
-        for sql_file in post_sql_files:
-            sql_path = Path(sql_file)
-            if not sql_path.exists():
-                print(f"WARNING: Post-load SQL file not found: {sql_path}")
-                continue
-            
-            print(f"  - Running: {sql_path.name}")
-            run_sql_file(cur, sql_path)
+        with connect_db(dbname) as conn, conn.cursor() as cur:
+            write_manifest(cur, plan.entries_for(loaded))
+            conn.commit()
+    elif workers > 1:
+        failed = load_tables_parallel(dbname, tables, workers, copy_mode=copy_mode)
+        if failed:
+            print(f"ERROR: Skipping post-load SQL, failed tables: {', '.join(sorted(failed))}")
+            return False
         
-        conn.commit()
+        with connect_db(dbname) as conn, conn.cursor() as cur:
+            run_post_load(cur, post_sql_files)
+            write_manifest(cur, plan.entries_for(loaded))
+            conn.commit()
+    else:
+        with connect_db(dbname) as conn, conn.cursor() as cur:
+            failed = load_tables_sequential(cur, tables, copy_mode=copy_mode)
+            run_post_load(cur, post_sql_files)
+            write_manifest(cur, plan.entries_for(set(loaded) - set(failed)))
+            conn.commit()
     
     print(f"Database '{dbname}' built successfully")
     return True
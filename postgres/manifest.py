@@ -0,0 +1,164 @@
+import re
+import json
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg.types.json import Jsonb
+
+
+MANIFEST_TABLE = "_build_manifest"
+HASH_BLOCK_SIZE = 1 << 20
+
+# Table entry keys that identify the inputs rather than configure the loader
+INPUT_KEYS = ("name", "schema", "file")
+
+MUTATION_RE = re.compile(r"\b(?:delete\s+from|update|insert\s+into|truncate(?:\s+table)?)\s+(\w+)", re.IGNORECASE)
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_options(table_cfg):
+    options = {k: v for k, v in table_cfg.items() if k not in INPUT_KEYS}
+    encoded = json.dumps(options, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def file_stat(path):
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def table_inputs(table_cfg, previous=None):
+    # previous is the table's last manifest entry; its CSV hash is reused while size and mtime match
+    csv_path = Path(table_cfg["file"])
+    csv_hash = csv_stat = None
+    if csv_path.exists():
+        csv_stat = file_stat(csv_path)
+        if previous and previous.get("csv") and previous.get("csv_stat") == csv_stat:
+            csv_hash = previous["csv"]
+        else:
+            csv_hash = hash_file(csv_path)
+    return {
+        "csv": csv_hash,
+        "csv_stat": csv_stat,
+        "schema": hash_file(table_cfg["schema"]),
+        "options": hash_options(table_cfg),
+    }
+
+
+def same_inputs(old, new):
+    # Only content counts: a touched but unchanged CSV is not a change
+    if old is None:
+        return False
+    return {k: v for k, v in old.items() if k != "csv_stat"} == {k: v for k, v in new.items() if k != "csv_stat"}
+
+
+def script_tables(sql_path, table_names):
+    """Return (tables the script reads or writes, tables the script modifies)."""
+    text = Path(sql_path).read_text(encoding="utf-8")
+    deps = {
+        name for name in table_names
+        if re.search(rf"\b{re.escape(name)}\b", text, re.IGNORECASE)
+    }
+    mutated = {m.lower() for m in MUTATION_RE.findall(text)}
+    return deps, {name for name in deps if name.lower() in mutated}
+
+
+def read_manifest(cur):
+    cur.execute(f"SELECT to_regclass('{MANIFEST_TABLE}') IS NOT NULL;")
+    if not cur.fetchone()[0]:
+        return {}
+    cur.execute(f"SELECT kind, name, inputs FROM {MANIFEST_TABLE};")
+    return {(kind, name): inputs for kind, name, inputs in cur.fetchall()}
+
+
+def write_manifest(cur, entries):
+    cur.execute(f"""
+        create table if not exists {MANIFEST_TABLE} (
+            kind text,
+            name text,
+            inputs jsonb,
+            built_at timestamptz default now(),
+            primary key (kind, name)
+        );
+    """)
+    for (kind, name), inputs in entries.items():
+        cur.execute(
+            f"INSERT INTO {MANIFEST_TABLE} (kind, name, inputs) VALUES (%s, %s, %s) "
+            "ON CONFLICT (kind, name) DO UPDATE SET inputs = EXCLUDED.inputs, built_at = now();",
+            (kind, name, Jsonb(inputs)),
+        )
+
+
+class BuildPlan:
+    def __init__(self, tables, scripts, entries):
+        self.tables = tables
+        self.scripts = scripts
+        self.entries = entries
+
+    def entries_for(self, loaded_tables):
+        # Failed tables are left out so the next build retries them
+        loaded = set(loaded_tables)
+        return {
+            key: inputs for key, inputs in self.entries.items()
+            if key[0] != "table" or key[1] in loaded
+        }
+
+
+def plan_build(cur, tables, post_sql_files, incremental=True, workers=4):
+    names = [table_cfg["name"] for table_cfg in tables]
+    manifest = read_manifest(cur)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        previous = [manifest.get(("table", name)) for name in names]
+        inputs = dict(zip(names, pool.map(table_inputs, tables, previous)))
+
+    scripts = []
+    for sql_file in post_sql_files:
+        sql_path = Path(sql_file)
+        if sql_path.exists():
+            deps, mutated = script_tables(sql_path, names)
+            scripts.append((sql_file, hash_file(sql_path), deps, mutated))
+        else:
+            scripts.append((sql_file, None, set(), set()))
+
+    entries = {("table", name): inputs[name] for name in names}
+    entries.update({("post_load", str(sql_file)): {"script": digest} for sql_file, digest, _, _ in scripts})
+
+    if not incremental:
+        return BuildPlan(tables, list(post_sql_files), entries)
+
+    changed = set()
+    for name in names:
+        cur.execute("SELECT to_regclass(%s) IS NULL;", (name,))
+        missing = cur.fetchone()[0]
+        if missing or not same_inputs(manifest.get(("table", name)), inputs[name]):
+            changed.add(name)
+
+    # A script that modifies a table makes that table depend on everything the script reads
+    script_changed = {
+        sql_file for sql_file, digest, _, _ in scripts
+        if manifest.get(("post_load", str(sql_file))) != {"script": digest}
+    }
+    while True:
+        extra = set()
+        for sql_file, _, deps, mutated in scripts:
+            if sql_file in script_changed or deps & changed:
+                extra |= mutated - changed
+        if not extra:
+            break
+        changed |= extra
+
+    to_load = [table_cfg for table_cfg in tables if table_cfg["name"] in changed]
+    to_run = [
+        sql_file for sql_file, _, deps, _ in scripts
+        if sql_file in script_changed or deps & changed
+    ]
+    return BuildPlan(to_load, to_run, entries)
@@ -0,0 +1,116 @@
+import sys
+import json
+import math
+import time
+import argparse
+from fnmatch import fnmatch
+from pathlib import Path
+from datetime import datetime
+
+import psycopg
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from main import get_connection_info
+from queries import load_queries
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def select_queries(queries, patterns):
+    if not patterns:
+        return queries
+    return {
+        name: query for name, query in queries.items()
+        if any(fnmatch(name, pattern) for pattern in patterns)
+    }
+
+
+def benchmark_query(conn, query, warmup, iterations):
+    timings = []
+    rows = 0
+
+    with conn.cursor() as cur:
+        for i in range(warmup + iterations):
+            start = time.perf_counter()
+            cur.execute(query, prepare=True)
+            rows = len(cur.fetchall())
+            elapsed = (time.perf_counter() - start) * 1000
+            if i >= warmup:
+                timings.append(elapsed)
+
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}")
+        plan = cur.fetchone()[0]
+
+    timings.sort()
+    return {
+        "rows": rows,
+        "latency_ms": {
+            "min": timings[0],
+            "p50": percentile(timings, 50),
+            "p95": percentile(timings, 95),
+            "p99": percentile(timings, 99),
+            "max": timings[-1],
+            "mean": sum(timings) / len(timings),
+        },
+        "plan": plan,
+    }
+
+
+def run_benchmark(dbname=None, patterns=None, warmup=2, iterations=10, output="benchmark.json"):
+    queries = select_queries(load_queries(), patterns)
+    if not queries:
+        print(f"No queries match: {', '.join(patterns)}")
+        return False
+
+    conninfo = get_connection_info(dbname)
+    report = {
+        "database": conninfo.get("dbname"),
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "warmup": warmup,
+        "iterations": iterations,
+        "queries": {},
+    }
+
+    print(f"Benchmarking {len(queries)} queries ({warmup} warm-up, {iterations} measured)")
+    print(f"{'query':<40} {'rows':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+
+    with psycopg.connect(**conninfo, autocommit=True) as conn:
+        for name, query in queries.items():
+            try:
+                result = benchmark_query(conn, query, warmup, iterations)
+            except psycopg.Error as e:
+                print(f"{name:<40} ERROR: {e}")
+                report["queries"][name] = {"error": str(e)}
+                continue
+
+            report["queries"][name] = result
+            lat = result["latency_ms"]
+            print(f"{name:<40} {result['rows']:>10} {lat['p50']:>10.1f} {lat['p95']:>10.1f} {lat['p99']:>10.1f}")
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Report written to {output}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the named queries in queries.sql")
+    parser.add_argument("queries", nargs="*", help="query names or glob patterns (default: all)")
+    parser.add_argument("--database", help="database to run against (default: PGDATABASE)")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--output", default="benchmark.json", help="JSON report path")
+    args = parser.parse_args()
+
+    if args.iterations < 1:
+        parser.error("--iterations must be at least 1")
+
+    ok = run_benchmark(args.database, args.queries, args.warmup, args.iterations, args.output)
+    if not ok:
+        sys.exit(1)
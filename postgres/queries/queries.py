@@ -1,4 +1,7 @@
 import sys
+import csv
+import json
+import argparse
 import psycopg 
 from psycopg.rows import dict_row
 from tabulate import tabulate
@@ -32,7 +35,20 @@ def load_queries():
     
     return queries
 
-def run_query(name):
+def _write_page(rows, fmt, writer, first_page):
+    if fmt == "csv":
+        if first_page:
+            writer.writerow(rows[0].keys())
+        writer.writerows(row.values() for row in rows)
+    elif fmt == "ndjson":
+        for row in rows:
+            sys.stdout.write(json.dumps(row, default=str, ensure_ascii=False) + "\n")
+    else:
+        print(tabulate(rows, headers="keys", tablefmt="psql"))
+    sys.stdout.flush()
+
+
+def run_query(name, fmt="table", fetch_size=2000, limit=None):
     queries = load_queries()
     query = queries.get(name)
     
@@ -42,24 +58,47 @@ def run_query(name):
         return 
     
     conninfo = get_connection_info()
+    writer = csv.writer(sys.stdout) if fmt == "csv" else None
+    total = 0
+    
     with psycopg.connect(**conninfo) as conn:
-        with conn.cursor(row_factory=dict_row) as cur:
+        # A named cursor keeps the result on the server; only one page is held here at a time
+        with conn.cursor(name=f"run_query_{name}", row_factory=dict_row) as cur:
+            cur.itersize = fetch_size
             cur.execute(query)
-            rows = cur.fetchall()
+            while limit is None or total < limit:
+                size = fetch_size if limit is None else min(fetch_size, limit - total)
+                rows = cur.fetchmany(size)
+                if not rows:
+                    break
+                _write_page(rows, fmt, writer, first_page=total == 0)
+                total += len(rows)
     
-    if rows:
-        print(tabulate(rows, headers="keys", tablefmt="psql"))
-    else:
+    if not total:
         print("No results.")
 
 
+def parse_args(queries):
+    parser = argparse.ArgumentParser(
+        description="Run a named query from queries.sql",
+        epilog=f"Available queries: {', '.join(queries.keys())}",
+    )
+    parser.add_argument("query_name")
+    parser.add_argument("--format", choices=["table", "csv", "ndjson"], default="table",
+                        help="output format; tables are printed one page per fetch")
+    parser.add_argument("--fetch-size", type=int, default=2000,
+                        help="rows fetched from the server per round trip")
+    parser.add_argument("--limit", type=int, help="stop after this many rows")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
+    if len(sys.argv) < 2:
         queries = load_queries()
-        print("Usage: python queries/queries.py <query_name>")
+        print("Usage: python queries/queries.py <query_name> [--format table|csv|ndjson] "
+              "[--fetch-size N] [--limit N]")
         print(f"Available queries: {', '.join(queries.keys())}")
         sys.exit(1)
     
-    query_name = sys.argv[1]
-    run_query(query_name)
-     
\ No newline at end of file
+    args = parse_args(load_queries())
+    run_query(args.query_name, fmt=args.format, fetch_size=args.fetch_size, limit=args.limit)
@@ -1,14 +1,34 @@
 import sys
+import argparse
 from main import build_database
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build a Postgres database from a version YAML")
+    parser.add_argument("version_name")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="load tables in parallel, one connection per worker")
+    parser.add_argument("--copy-mode", choices=["block", "line"], default="block",
+                        help="stream the CSV to COPY in raw 1 MiB blocks or line by line")
+    parser.add_argument("--fast", action="store_true",
+                        help="load into unlogged staging tables and swap them in when done")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only reload tables whose CSV, schema or loader options changed")
+    parser.add_argument("--validate", action="store_true",
+                        help="type-check every CSV against its schema before loading")
+    parser.add_argument("--quarantine", action="store_true",
+                        help="validate, move bad rows to a reject file and load the rest")
+    parser.add_argument("--reject-dir", default="rejects",
+                        help="directory for reject and error report files (default: rejects)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python run.py <version_name>")
-        sys.exit(1)
-    
-    version_name = sys.argv[1]
-    success = build_database(version_name)
+    args = parse_args()
+    success = build_database(args.version_name, workers=args.workers, copy_mode=args.copy_mode,
+                             fast=args.fast, incremental=args.incremental,
+                             validate=args.validate, quarantine=args.quarantine,
+                             reject_dir=args.reject_dir)
     
     if not success:
         sys.exit(1)
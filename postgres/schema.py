@@ -0,0 +1,135 @@
+import re
+from pathlib import Path
+
+
+CREATE_TABLE_RE = re.compile(
+    r"create\s+table\s+(?:if\s+not\s+exists\s+)?(\w+)\s*\((.*)\)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _split_top_level(body):
+    parts = []
+    depth = 0
+    current = []
+    for ch in body:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def parse_create_table(schema_path):
+    """Return (table_name, [(column, type), ...]) from a `create table` file."""
+    text = Path(schema_path).read_text(encoding="utf-8")
+    match = CREATE_TABLE_RE.search(text)
+    if not match:
+        raise ValueError(f"No create table statement found in {schema_path}")
+
+    name, body = match.groups()
+    columns = []
+    for definition in _split_top_level(body):
+        col, _, col_type = definition.partition(" ")
+        columns.append((col, col_type.strip()))
+
+    return name, columns
+
+
+def render_create_table(name, columns, unlogged=False, partition_by=None, temporary=False):
+    cols = ",\n".join(f"    {col} {col_type}" for col, col_type in columns)
+    kind = "temporary table" if temporary else "unlogged table" if unlogged else "table"
+    partitioning = ""
+    if partition_by:
+        partitioning = f" partition by {partition_by['strategy']} ({partition_by['column']})"
+    return f"create {kind} if not exists {name} (\n{cols}\n){partitioning}"
+
+
+def partition_name(table, suffix):
+    return f"{table}_{suffix}"
+
+
+def partition_suffixes(partition_by):
+    return [str(value) for value in partition_by["values"]] + ["default"]
+
+
+def render_partitions(table, partition_by, unlogged=False):
+    """One partition per value (a single year for range partitioning), plus a default partition."""
+    strategy = partition_by["strategy"].lower()
+    if strategy not in ("list", "range"):
+        raise ValueError(f"Unknown partition strategy: {strategy}")
+
+    kind = "unlogged table" if unlogged else "table"
+    statements = []
+    for value in partition_by["values"]:
+        if strategy == "list":
+            bounds = f"for values in ({value})"
+        else:
+            bounds = f"for values from ({value}) to ({value + 1})"
+        statements.append(
+            f"create {kind} if not exists {partition_name(table, value)} partition of {table} {bounds}"
+        )
+    statements.append(
+        f"create {kind} if not exists {partition_name(table, 'default')} partition of {table} default"
+    )
+    return statements
+
+
+def project_columns(columns, drop_cols):
+    """Split schema columns into (kept column indexes, kept columns, unknown drop_cols).
+
+    Unquoted identifiers are case-insensitive in Postgres, so matching is too.
+    """
+    drop = {col.lower() for col in drop_cols or []}
+    keep_idx = [i for i, (col, _) in enumerate(columns) if col.lower() not in drop]
+    known = {col.lower() for col, _ in columns}
+    unknown = [col for col in drop_cols or [] if col.lower() not in known]
+    return keep_idx, [columns[i] for i in keep_idx], unknown
+
+
+CREATE_INDEX_RE = re.compile(
+    r"create\s+(unique\s+)?index\s+(?:if\s+not\s+exists\s+)?(\w+)\s+on\s+(\w+)\s*(.*)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def split_statements(text):
+    lines = [line for line in text.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def parse_indexes(sql_path):
+    """Return (indexes, other_statements) from an index script.
+
+    Each index is a dict with name, table, unique and definition (everything after the table name).
+    """
+    indexes = []
+    others = []
+    for stmt in split_statements(Path(sql_path).read_text(encoding="utf-8")):
+        match = CREATE_INDEX_RE.fullmatch(stmt)
+        if match:
+            unique, name, table, definition = match.groups()
+            indexes.append({
+                "name": name,
+                "table": table,
+                "unique": bool(unique),
+                "definition": definition.strip(),
+            })
+        else:
+            others.append(stmt)
+    return indexes, others
+
+
+def render_create_index(index, name=None, table=None, if_not_exists=True):
+    unique = "unique " if index["unique"] else ""
+    exists = "if not exists " if if_not_exists else ""
+    return (
+        f"create {unique}index {exists}{name or index['name']} "
+        f"on {table or index['table']} {index['definition']}"
+    )
@@ -0,0 +1,33 @@
+-- One row per person per source table, with a normalized name for matching across tables
+DROP TABLE IF EXISTS personidentitet;
+
+CREATE TABLE personidentitet AS
+SELECT upper(regexp_replace(btrim(navn), '\s+', ' ', 'g')) AS normalisertNavn,
+       fødselsdato,
+       upper(kommune) AS kommune,
+       'politikere'::text AS tabell,
+       concat_ws(':', parti, kommuneNr, listeplass) AS kildeNøkkel
+FROM politikere
+WHERE navn IS NOT NULL
+UNION ALL
+SELECT DISTINCT
+       upper(regexp_replace(btrim(navn), '\s+', ' ', 'g')),
+       fødselsdato,
+       upper(kommuneNavn),
+       'person',
+       UUID
+FROM person
+WHERE navn IS NOT NULL
+UNION ALL
+SELECT DISTINCT
+       upper(regexp_replace(btrim(eierPersonNavn), '\s+', ' ', 'g')),
+       eierPersonFødselsdato,
+       upper(eierPersonKommune),
+       'eierskap',
+       eierPersonUUID
+FROM eierskap
+WHERE eierPersonNavn IS NOT NULL;
+
+CREATE INDEX personidentitet_navn_fodselsdato_idx ON personidentitet (normalisertNavn, fødselsdato);
+
+ANALYZE personidentitet;
@@ -1,3 +1,10 @@
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_matviews WHERE schemaname = current_schema() AND matviewname = 'alleselskaper') THEN
+        DROP MATERIALIZED VIEW alleSelskaper;
+    END IF;
+END $$;
+
 DROP VIEW IF EXISTS alleSelskaper;
 
 CREATE VIEW alleSelskaper AS
@@ -5,4 +12,4 @@ SELECT *
 FROM selskap
 UNION ALL
 SELECT *
-FROM konkurs;
\ No newline at end of file
+FROM konkurs;
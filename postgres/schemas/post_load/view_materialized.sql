@@ -0,0 +1,36 @@
+-- Materialized alternative to view.sql: list this file in post_load_sql instead of view.sql.
+-- kilde tells which table a row came from, so the unique index only needs UUID to be unique
+-- within selskap and within konkurs. If a table repeats a UUID, the index is left out and the
+-- view is refreshed without CONCURRENTLY.
+-- CONCURRENTLY only keeps the view readable during a standalone refresh; in a build the refresh
+-- runs in the same transaction that reloaded selskap and konkurs, which already holds their locks.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_views WHERE schemaname = current_schema() AND viewname = 'alleselskaper') THEN
+        DROP VIEW alleSelskaper;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_matviews WHERE schemaname = current_schema() AND matviewname = 'alleselskaper') THEN
+        CREATE MATERIALIZED VIEW alleSelskaper AS
+        SELECT *, 'selskap'::text AS kilde
+        FROM selskap
+        UNION ALL
+        SELECT *, 'konkurs'::text AS kilde
+        FROM konkurs;
+
+        IF EXISTS (SELECT 1 FROM alleSelskaper GROUP BY UUID, kilde HAVING count(*) > 1) THEN
+            RAISE NOTICE 'alleSelskaper: UUID repeats within selskap or konkurs, no unique index';
+        ELSE
+            CREATE UNIQUE INDEX alleselskaper_uuid_idx ON alleSelskaper (UUID, kilde);
+        END IF;
+        CREATE INDEX alleselskaper_orgnr_idx ON alleSelskaper (orgNr);
+        CREATE INDEX alleselskaper_navn_idx ON alleSelskaper (navn);
+    ELSIF EXISTS (SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND indexname = 'alleselskaper_uuid_idx') THEN
+        -- Fails if the reloaded tables now repeat a UUID; drop the view to rebuild it without the index
+        REFRESH MATERIALIZED VIEW CONCURRENTLY alleSelskaper;
+    ELSE
+        REFRESH MATERIALIZED VIEW alleSelskaper;
+    END IF;
+END $$;
+
+ANALYZE alleSelskaper;
@@ -0,0 +1,268 @@
+import os
+import re
+import csv
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from csv_input import open_csv
+from schema import parse_create_table, project_columns
+
+
+CHUNK_LINES = 50_000
+MAX_REPORTED_ERRORS = 20
+
+INT_RANGES = {
+    "smallint": (-2**15, 2**15 - 1),
+    "integer": (-2**31, 2**31 - 1),
+    "int": (-2**31, 2**31 - 1),
+    "bigint": (-2**63, 2**63 - 1),
+}
+
+MONTHS = {
+    name: i for i, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1
+    )
+}
+
+ISO_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+DATE_FIELDS_RE = re.compile(r"(\w+)[-/. ](\w+)[-/. ](\w+)")
+TIME_RE = re.compile(r"\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?\s*([+-]\d{1,2}(:?\d{2})?|z|utc)?", re.IGNORECASE)
+
+
+def date_order(date_style):
+    # Field order Postgres uses for ambiguous dates under a DateStyle setting
+    style = (date_style or "").upper()
+    for order in ("DMY", "MDY", "YMD"):
+        if order in style:
+            return order
+    if "EUROPEAN" in style or "GERMAN" in style:
+        return "DMY"
+    return "MDY"
+
+
+def _valid_ymd(year, month, day):
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return False
+    if month == 2:
+        leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+        return day <= (29 if leap else 28)
+    return day <= (30 if month in (4, 6, 9, 11) else 31)
+
+
+def check_date(value, order):
+    value = value.strip()
+    match = ISO_DATE_RE.fullmatch(value)
+    if match:
+        return _valid_ymd(*map(int, match.groups()))
+
+    match = DATE_FIELDS_RE.fullmatch(value)
+    if not match:
+        return False
+    raw = match.groups()
+    named = [r for r in raw if not r.isdigit()]
+
+    if len(named) > 1:
+        return False
+    if named:
+        # A spelled out month can sit in any position; day comes before year unless YMD
+        month = MONTHS.get(named[0][:3].lower())
+        if month is None:
+            return False
+        rest = [r for r in raw if r.isdigit()]
+        year_raw, day = (rest[0], int(rest[1])) if order == "YMD" else (rest[1], int(rest[0]))
+    else:
+        fields = dict(zip(order, raw))
+        year_raw, month, day = fields["Y"], int(fields["M"]), int(fields["D"])
+
+    year = int(year_raw)
+    if len(year_raw) <= 2:
+        year += 2000 if year < 70 else 1900
+    return _valid_ymd(year, month, day)
+
+
+def check_timestamp(value, order):
+    value = value.strip()
+    date_part, sep, time_part = value.replace("T", " ", 1).partition(" ")
+    if not check_date(date_part, order):
+        return False
+    return not sep or bool(TIME_RE.fullmatch(time_part.strip()))
+
+
+def make_checker(col_type, order):
+    """Return a function that tells whether a non-empty CSV value casts to col_type."""
+    base = col_type.lower().split("(")[0].strip()
+
+    if base in INT_RANGES:
+        low, high = INT_RANGES[base]
+
+        def check_int(value):
+            try:
+                return low <= int(value) <= high
+            except ValueError:
+                return False
+        return check_int
+
+    if base in ("real", "double precision", "float", "numeric", "decimal"):
+        def check_float(value):
+            try:
+                float(value)
+                return True
+            except ValueError:
+                return False
+        return check_float
+
+    if base in ("varchar", "character varying"):
+        match = re.search(r"\((\d+)\)", col_type)
+        if match:
+            limit = int(match.group(1))
+            return lambda value: len(value) <= limit
+        return None
+
+    if base == "date":
+        return lambda value: check_date(value, order) or check_timestamp(value, order)
+
+    if base.startswith("timestamp"):
+        return lambda value: check_timestamp(value, order)
+
+    return None
+
+
+def _validate_chunk(columns, keep_idx, delimiter, order, first_line, lines):
+    # Runs in a worker process; returns (errors, [(first_line, last_line, text), ...])
+    # Only kept columns are type-checked: drop_cols never reach the database
+    checkers = [(i, *columns[i], make_checker(columns[i][1], order)) for i in keep_idx]
+    checkers = [c for c in checkers if c[3] is not None]
+    errors = []
+    rejects = []
+
+    reader = csv.reader(lines, delimiter=delimiter)
+    consumed = 0
+    for record in reader:
+        start = first_line + consumed
+        end = first_line + reader.line_num - 1
+        consumed = reader.line_num
+        bad = []
+
+        if len(record) != len(columns):
+            bad.append((start, None, f"{len(columns)} columns", f"{len(record)} values"))
+        else:
+            for i, col, col_type, check in checkers:
+                value = record[i]
+                if value != "" and not check(value):
+                    bad.append((start, col, col_type, value))
+
+        if bad:
+            errors.extend(bad)
+            rejects.append((start, end, "".join(lines[start - first_line:end - first_line + 1])))
+
+    return errors, rejects
+
+
+def _chunks(f, size=CHUNK_LINES):
+    # Cuts only between records: a chunk ends where the number of quote characters is even
+    chunk = []
+    first_line = 2  # line 1 is the header
+    quotes = 0
+    for line in f:
+        chunk.append(line)
+        quotes += line.count('"')
+        if len(chunk) >= size and quotes % 2 == 0:
+            yield first_line, chunk
+            first_line += len(chunk)
+            chunk = []
+            quotes = 0
+    if chunk:
+        yield first_line, chunk
+
+
+def write_error_report(report_path, errors):
+    # Every error, one per row: line, column (empty for a wrong column count), expected, value
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, "w", encoding="utf-8", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow(["line", "column", "expected", "value"])
+        writer.writerows((line_no, col or "", expected, value) for line_no, col, expected, value in errors)
+
+
+def validate_table(pool, table_cfg, workers, reject_dir=None, report_dir=None):
+    """Type-check one table's CSV.
+
+    Every error is written to <report_dir>/<table>.errors.csv; the console shows the first few.
+    Returns (error count, set of rejected line numbers), or (error count, None) when
+    the file cannot be loaded at all.
+    """
+    name = table_cfg["name"]
+    csv_path = Path(table_cfg["file"])
+    delimiter = table_cfg.get("delimiter", ",")
+    order = date_order(table_cfg.get("date_style"))
+    _, columns = parse_create_table(table_cfg["schema"])
+    keep_idx, _, _ = project_columns(columns, table_cfg.get("drop_cols"))
+
+    print(f"Validating table: {name}")
+    if not csv_path.exists():
+        print(f"ERROR: CSV file not found: {csv_path}")
+        return 1, None
+
+    errors = []
+    rejects = []
+    pending = set()
+
+    with open_csv(csv_path, newline="") as f:
+        header = next(csv.reader([f.readline()], delimiter=delimiter), [])
+        if len(header) != len(columns):
+            # Every row would be shifted, so there is nothing sensible to quarantine
+            print(f"  - line 1: schema defines {len(columns)} columns, header has {len(header)}")
+            return 1, None
+
+        for first_line, lines in _chunks(f):
+            pending.add(pool.submit(_validate_chunk, columns, keep_idx, delimiter, order, first_line, lines))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_errors, chunk_rejects = future.result()
+                    errors.extend(chunk_errors)
+                    rejects.extend(chunk_rejects)
+
+        for future in pending:
+            chunk_errors, chunk_rejects = future.result()
+            errors.extend(chunk_errors)
+            rejects.extend(chunk_rejects)
+
+    errors.sort(key=lambda e: e[0])
+    rejects.sort()
+
+    for line_no, col, expected, value in errors[:MAX_REPORTED_ERRORS]:
+        where = f"column '{col}'" if col else "row"
+        print(f"  - line {line_no}, {where}: expected {expected}, got {value!r}")
+    if len(errors) > MAX_REPORTED_ERRORS:
+        print(f"  - ... and {len(errors) - MAX_REPORTED_ERRORS} more")
+    print(f"  - {len(errors)} errors in {len(rejects)} rows")
+
+    if report_dir and errors:
+        report_path = Path(report_dir) / f"{name}.errors.csv"
+        write_error_report(report_path, errors)
+        print(f"  - All errors written to {report_path}")
+
+    if reject_dir and rejects:
+        reject_dir = Path(reject_dir)
+        reject_dir.mkdir(parents=True, exist_ok=True)
+        reject_path = reject_dir / f"{name}.rejects.csv"
+        with open(reject_path, "w", encoding="utf-8", newline="") as out:
+            out.writelines(text for _, _, text in rejects)
+        print(f"  - Rejected rows written to {reject_path}")
+
+    skip_lines = {line for start, end, _ in rejects for line in range(start, end + 1)}
+    return len(errors), skip_lines
+
+
+def validate_tables(tables, workers=None, reject_dir=None, report_dir=None):
+    """Validate every table's CSV against its schema before anything is loaded.
+
+    Returns {table name: (error count, rejected line numbers)}.
+    """
+    workers = workers or os.cpu_count() or 1
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for table_cfg in tables:
+            results[table_cfg["name"]] = validate_table(pool, table_cfg, workers, reject_dir, report_dir)
+    return results